@@ -1,58 +1,128 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+from datetime import date, datetime, timedelta
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Response
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 
-from ..database import get_accommodations_by_destination, get_accommodation_by_id, get_destination_by_id
+from ..availability import availability_index
+from ..config import settings
+from ..database import (
+    search_accommodations, get_accommodation_by_id, get_accommodations_by_destination, ACCOMMODATION_SORTS
+)
+from ..loaders import Loaders, get_loaders
+from ..pagination import encode_cursor, decode_cursor
+from ..projection import FIELDS_QUERY, select_columns
 from ..auth.utils import get_current_user
 from .models import AccommodationResponse, AccommodationDetail
 
 router = APIRouter()
 
+def parse_date_range(start_date: str, end_date: str) -> tuple:
+    """Parse an ISO date range, clamped so it does not start in the past"""
+    try:
+        start = max(datetime.fromisoformat(start_date).date(), date.today())
+        end = datetime.fromisoformat(end_date).date()
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Dates must be in ISO format"
+        )
+    
+    if (end - start).days > settings.AVAILABILITY_MAX_DAYS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Date range cannot exceed {settings.AVAILABILITY_MAX_DAYS} days"
+        )
+    return start, end
+
 @router.get("/", response_model=List[AccommodationResponse])
 async def get_accommodations(
+    response: Response,
     destination_id: Optional[str] = Query(None, description="Filter by destination ID"),
     type: Optional[str] = Query(None, description="Filter by accommodation type"),
     min_price: Optional[float] = Query(None, description="Minimum price per night"),
     max_price: Optional[float] = Query(None, description="Maximum price per night"),
     min_rating: Optional[float] = Query(None, description="Minimum rating"),
+    sort: str = Query("price", regex="^-?(price|rating)$", description="Sort by price or rating, prefix with - for descending"),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of results"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    fields: Optional[str] = FIELDS_QUERY,
+    loaders: Loaders = Depends(get_loaders),
 ):
-    """Get accommodations with optional filtering"""
-    # If destination_id is provided, get accommodations for that destination
+    """Get accommodations with optional filtering.
+
+    Results are paginated; the X-Next-Cursor response header is set when more results exist.
+    """
+    # If destination_id is provided, verify destination exists
     if destination_id:
-        # Verify destination exists
-        destination = await get_destination_by_id(destination_id)
+        destination = await loaders.destinations.load(destination_id)
         if not destination:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Destination not found"
             )
-        
-        accommodations = await get_accommodations_by_destination(destination_id)
-    else:
-        # Get all accommodations (this would typically be paginated in a real app)
-        # For simplicity, let's assume we have a function to get all accommodations
-        # In reality, you'd want to paginate this
-        accommodations = []
-        destinations = await get_destination_by_id()
-        for destination in destinations:
-            dest_accommodations = await get_accommodations_by_destination(destination["id"])
-            accommodations.extend(dest_accommodations)
-    
-    # Apply filters
-    filtered_accommodations = accommodations
-    
-    if type:
-        filtered_accommodations = [a for a in filtered_accommodations if a["type"] == type]
-    
-    if min_price is not None:
-        filtered_accommodations = [a for a in filtered_accommodations if a["price_per_night"] >= min_price]
-    
-    if max_price is not None:
-        filtered_accommodations = [a for a in filtered_accommodations if a["price_per_night"] <= max_price]
-    
-    if min_rating is not None:
-        filtered_accommodations = [a for a in filtered_accommodations if a["rating"] >= min_rating]
-    
-    return filtered_accommodations
+    
+    sort_column, _ = ACCOMMODATION_SORTS[sort]
+    # Every sort column is numeric
+    after = decode_cursor(cursor, (int, float)) if cursor else None
+    
+    # Fetch one extra row to know whether another page follows
+    accommodations = await search_accommodations(
+        destination_id=destination_id,
+        type=type,
+        min_price=min_price,
+        max_price=max_price,
+        min_rating=min_rating,
+        sort=sort,
+        limit=limit + 1,
+        after=after,
+        columns=select_columns(AccommodationResponse, fields, required=("id", sort_column)),
+    )
+    
+    if len(accommodations) > limit:
+        accommodations = accommodations[:limit]
+        last = accommodations[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last[sort_column], last["id"])
+    
+    if fields:
+        # Sparse fieldsets would fail response model validation
+        return JSONResponse(accommodations, headers=dict(response.headers))
+    
+    return accommodations
+
+# Columns needed to search availability and describe the results
+AVAILABLE_COLUMNS = "id,destination_id,name,type,price_per_night,capacity"
+
+@router.get("/available")
+async def find_available_accommodations(
+    destination_id: str,
+    start_date: str = Query(..., description="Earliest check-in date"),
+    end_date: str = Query(..., description="Latest check-out date"),
+    nights: int = Query(..., ge=1, description="Consecutive nights required"),
+    travelers: int = Query(1, ge=1),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Find accommodations at a destination with the requested consecutive nights free between two dates"""
+    destination = await loaders.destinations.load(destination_id)
+    if not destination:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Destination not found"
+        )
+    
+    start, end = parse_date_range(start_date, end_date)
+    accommodations = await get_accommodations_by_destination(destination_id, AVAILABLE_COLUMNS)
+    stays = await availability_index.find_stays(accommodations, start, end, nights, travelers)
+    
+    return [
+        {
+            "accommodation_id": a["id"],
+            "name": a["name"],
+            "type": a["type"],
+            "price_per_night": a["price_per_night"],
+            "check_in_dates": [d.isoformat() for d in stays[a["id"]]],
+        }
+        for a in accommodations if a["id"] in stays
+    ]
 
 @router.get("/{accommodation_id}", response_model=AccommodationDetail)
 async def get_accommodation(accommodation_id: str):
@@ -72,9 +142,10 @@ async def get_accommodation_availability(
     accommodation_id: str,
     start_date: str,
     end_date: str,
+    travelers: int = Query(1, ge=1),
     current_user: dict = Depends(get_current_user)
 ):
-    """Get availability for a specific accommodation within a date range"""
+    """Get the nights in a date range with room for the given number of travelers"""
     accommodation = await get_accommodation_by_id(accommodation_id)
     
     if not accommodation:
@@ -83,20 +154,14 @@ async def get_accommodation_availability(
             detail="Accommodation not found"
         )
     
-    # In a real app, you would query a booking system
-    # For now, we'll return mock availability data
+    start, end = parse_date_range(start_date, end_date)
+    remaining = await availability_index.remaining(accommodation, start, end)
+    dates = [(start + timedelta(days=i)).isoformat() for i in range(len(remaining))]
+    
     availability = {
         "accommodation_id": accommodation_id,
-        "available_dates": [
-            "2025-04-01", "2025-04-02", "2025-04-03",
-            "2025-04-07", "2025-04-08", "2025-04-09",
-            "2025-04-15", "2025-04-16", "2025-04-17"
-        ],
-        "booked_dates": [
-            "2025-04-04", "2025-04-05", "2025-04-06",
-            "2025-04-10", "2025-04-11", "2025-04-12",
-            "2025-04-13", "2025-04-14"
-        ]
+        "available_dates": [d for d, r in zip(dates, remaining) if r >= travelers],
+        "booked_dates": [d for d, r in zip(dates, remaining) if r < travelers]
     }
     
     return availability
@@ -0,0 +1,64 @@
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from fastapi.responses import PlainTextResponse
+
+from ..auth.utils import require_admin, token_cache, password_pool
+from ..ai.utils import get_ai_stats
+from ..ai.jobs import trip_plan_jobs
+from ..ai.upstream import openai_upstream
+from ..cache import catalog_cache, search_cache, user_cache
+from ..idempotency import booking_idempotency
+from ..inventory import inventory
+from ..profiling import profile_store
+from ..query_log import query_log
+
+router = APIRouter(dependencies=[Depends(require_admin)])
+
+@router.get("/cache")
+async def get_cache_stats():
+    """Get hit/miss statistics for the in-process caches"""
+    return {
+        "catalog": catalog_cache.stats(),
+        "search": search_cache.stats(),
+        "users": user_cache.stats(),
+        "tokens": token_cache.stats(),
+        "booking_idempotency": booking_idempotency.stats(),
+    }
+
+@router.get("/password-hashing")
+async def get_password_hashing_stats():
+    """Get queueing statistics for the password hashing worker pool"""
+    return password_pool.stats()
+
+@router.get("/ai")
+async def get_ai_usage_stats():
+    """Get AI response cache, spend, upstream admission control and job queue statistics"""
+    return {**get_ai_stats(), "upstream": openai_upstream.stats(), "trip_plan_jobs": trip_plan_jobs.stats()}
+
+@router.get("/inventory")
+async def get_inventory_stats():
+    """Get capacity reservation, lock contention and availability index statistics"""
+    return inventory.stats()
+
+@router.get("/queries")
+async def get_query_stats(
+    limit: int = Query(20, ge=1, le=1000),
+    sort: str = Query("total", regex="^(total|mean|max|calls|rows)$")
+):
+    """Get the top database query fingerprints and the most recent slow queries"""
+    return query_log.stats(limit, sort)
+
+@router.get("/profiles")
+async def list_profiles():
+    """List stored request profiles, newest first"""
+    return profile_store.summaries()
+
+@router.get("/profiles/{profile_id}", response_class=PlainTextResponse)
+async def get_profile(profile_id: str):
+    """Get a request profile as folded stacks (microseconds), ready for flamegraph.pl or speedscope"""
+    profile = profile_store.get(profile_id)
+    if not profile:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Profile not found"
+        )
+    return PlainTextResponse(profile.folded())
@@ -0,0 +1,140 @@
+import asyncio
+import itertools
+import time
+import uuid
+
+from ..config import settings
+
+class QueueFullError(Exception):
+    pass
+
+class Job:
+    def __init__(self, owner_id: str, dedup_key, priority: int, func, args):
+        self.id = str(uuid.uuid4())
+        self.owner_id = owner_id
+        self.dedup_key = dedup_key
+        self.priority = priority
+        self.func = func
+        self.args = args
+        self.status = "queued"  # queued -> running -> completed | failed
+        self.result = None
+        self.error = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.done = asyncio.Event()
+
+    def to_dict(self):
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "priority": self.priority,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+            "result": self.result,
+            "error": self.error,
+        }
+
+class JobQueue:
+    """Bounded priority queue of coroutine jobs run by a fixed set of worker tasks.
+
+    Lower priority values run first. Submitting the same dedup key again
+    returns the existing job while it is queued, running or its result is
+    still stored. Finished jobs are kept for result_ttl seconds.
+    """
+
+    def __init__(self, workers: int, maxsize: int, result_ttl: float):
+        self.workers = workers
+        self.maxsize = maxsize
+        self.result_ttl = result_ttl
+        self._queue = None
+        self._tasks = []
+        self._jobs = {}  # job id -> Job
+        self._by_dedup_key = {}  # dedup key -> job id
+        self._sequence = itertools.count()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.rejected = 0
+
+    async def start(self):
+        self._queue = asyncio.PriorityQueue(maxsize=self.maxsize)
+        self._tasks = [asyncio.ensure_future(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def submit(self, owner_id: str, dedup_key, priority: int, func, *args) -> Job:
+        self._purge_expired()
+
+        existing = self._jobs.get(self._by_dedup_key.get(dedup_key))
+        if existing and existing.status != "failed":
+            self.deduplicated += 1
+            return existing
+
+        job = Job(owner_id, dedup_key, priority, func, args)
+        try:
+            self._queue.put_nowait((priority, next(self._sequence), job))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError()
+
+        self._jobs[job.id] = job
+        self._by_dedup_key[dedup_key] = job.id
+        self.submitted += 1
+        return job
+
+    def get(self, job_id: str):
+        self._purge_expired()
+        return self._jobs.get(job_id)
+
+    async def wait(self, job: Job, timeout: float):
+        """Wait up to timeout seconds for the job to finish (long-poll)"""
+        try:
+            await asyncio.wait_for(job.done.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        return job
+
+    async def _worker(self):
+        while True:
+            _, _, job = await self._queue.get()
+            job.status = "running"
+            try:
+                job.result = await job.func(*job.args)
+                job.status = "completed"
+            except Exception as e:
+                job.error = str(e)
+                job.status = "failed"
+            finally:
+                job.finished_at = time.time()
+                job.done.set()
+                self._queue.task_done()
+
+    def _purge_expired(self):
+        cutoff = time.time() - self.result_ttl
+        for job in [j for j in self._jobs.values() if j.finished_at and j.finished_at < cutoff]:
+            del self._jobs[job.id]
+            if self._by_dedup_key.get(job.dedup_key) == job.id:
+                del self._by_dedup_key[job.dedup_key]
+
+    def stats(self):
+        statuses = {}
+        for job in self._jobs.values():
+            statuses[job.status] = statuses.get(job.status, 0) + 1
+        return {
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize() if self._queue else 0,
+            "max_queue_size": self.maxsize,
+            "submitted": self.submitted,
+            "deduplicated": self.deduplicated,
+            "rejected": self.rejected,
+            "jobs": statuses,
+        }
+
+trip_plan_jobs = JobQueue(
+    workers=settings.AI_JOB_WORKERS,
+    maxsize=settings.AI_JOB_QUEUE_SIZE,
+    result_ttl=settings.AI_JOB_RESULT_TTL,
+)
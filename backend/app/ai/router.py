@@ -1,28 +1,74 @@
-from fastapi import APIRouter, Depends, HTTPException, status, Body
+import json
+from fastapi import APIRouter, Depends, HTTPException, status, Body, Query, Request
+from fastapi.responses import StreamingResponse
 from typing import Optional
 
 from ..auth.utils import get_current_user
-from ..database import get_destination_by_id
-from .utils import generate_travel_recommendations, generate_packing_list, answer_space_travel_question
+from ..loaders import Loaders, get_loaders
+from .jobs import trip_plan_jobs, QueueFullError
+from .utils import (
+    generate_travel_recommendations, generate_packing_list, answer_space_travel_question,
+    stream_chat_completion, travel_recommendations_messages, packing_list_messages,
+    space_travel_question_messages
+)
 
 router = APIRouter()
 
+STREAM_QUERY = Query(False, description="Stream the answer as Server-Sent Events")
+
+def event_stream(request: Request, chunks, meta: dict):
+    """Relay completion chunks as Server-Sent Events.
+
+    Emits a `meta` event, one `data` event per chunk ({"delta": text}) and a
+    final `done` event. The upstream completion is closed as soon as the client
+    disconnects so abandoned generations stop consuming tokens.
+    """
+    async def events():
+        try:
+            yield f"event: meta\ndata: {json.dumps(meta)}\n\n"
+            async for chunk in chunks:
+                if await request.is_disconnected():
+                    break
+                yield f"data: {json.dumps({'delta': chunk})}\n\n"
+            else:
+                yield "event: done\ndata: {}\n\n"
+        except Exception as e:
+            yield f"event: error\ndata: {json.dumps({'detail': str(e)})}\n\n"
+        finally:
+            await chunks.aclose()
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @router.post("/recommendations")
 async def get_travel_recommendations(
+    request: Request,
     user_preferences: dict = Body(...),
     destination_id: Optional[str] = None,
-    current_user: dict = Depends(get_current_user)
+    stream: bool = STREAM_QUERY,
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get AI-generated travel recommendations based on user preferences"""
     # Verify destination if provided
     if destination_id:
-        destination = await get_destination_by_id(destination_id)
+        destination = await loaders.destinations.load(destination_id)
         if not destination:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Destination not found"
             )
     
+    if stream:
+        return event_stream(
+            request,
+            stream_chat_completion(travel_recommendations_messages(user_preferences, destination_id)),
+            {}
+        )
+    
     # Generate recommendations
     recommendations = await generate_travel_recommendations(user_preferences, destination_id)
     
@@ -32,20 +78,30 @@ async def get_travel_recommendations(
 
 @router.post("/packing-list")
 async def get_packing_list(
+    request: Request,
     destination_id: str,
     duration: int,
     user_preferences: Optional[dict] = None,
-    current_user: dict = Depends(get_current_user)
+    stream: bool = STREAM_QUERY,
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get AI-generated packing list for a space trip"""
     # Verify destination
-    destination = await get_destination_by_id(destination_id)
+    destination = await loaders.destinations.load(destination_id)
     if not destination:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="Destination not found"
         )
     
+    if stream:
+        return event_stream(
+            request,
+            stream_chat_completion(packing_list_messages(destination_id, duration, user_preferences)),
+            {"destination": destination["name"], "duration": duration}
+        )
+    
     # Generate packing list
     packing_list = await generate_packing_list(destination_id, duration, user_preferences)
     
@@ -57,7 +113,9 @@ async def get_packing_list(
 
 @router.post("/ask")
 async def ask_question(
+    request: Request,
     question: str = Body(..., embed=True),
+    stream: bool = STREAM_QUERY,
     current_user: Optional[dict] = Depends(get_current_user)
 ):
     """Ask a question about space travel and get an AI-generated answer"""
@@ -69,6 +127,13 @@ async def ask_question(
             "preferences": current_user["preferences"]
         }
     
+    if stream:
+        return event_stream(
+            request,
+            stream_chat_completion(space_travel_question_messages(question, user_context)),
+            {"question": question}
+        )
+    
     # Generate answer
     answer = await answer_space_travel_question(question, user_context)
     
@@ -77,12 +142,8 @@ async def ask_question(
         "answer": answer
     }
 
-@router.post("/trip-planner")
-async def plan_space_trip(
-    trip_data: dict = Body(...),
-    current_user: dict = Depends(get_current_user)
-):
-    """Generate a personalized space trip itinerary"""
+async def prepare_trip_plan(trip_data: dict, current_user: dict, loaders: Loaders):
+    """Validate trip data and build the trip planning prompt"""
     # Build prompt for AI
     destination_id = trip_data.get("destination_id")
     duration = trip_data.get("duration", 7)
@@ -90,7 +151,7 @@ async def plan_space_trip(
     budget = trip_data.get("budget", "medium")
     
     # Verify destination
-    destination = await get_destination_by_id(destination_id)
+    destination = await loaders.destinations.load(destination_id)
     if not destination:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -113,12 +174,82 @@ async def plan_space_trip(
     
     prompt += "\nCreate a day-by-day itinerary with activities, meals, and experiences."
     
-    # Generate the itinerary
-    itinerary = await answer_space_travel_question(prompt)
-    
     return {
         "destination": destination["name"],
         "duration": duration,
         "user_preferences": user_preferences,
+        "prompt": prompt
+    }
+
+async def generate_trip_plan(plan: dict):
+    """Generate the itinerary for a prepared trip plan"""
+    itinerary = await answer_space_travel_question(plan["prompt"])
+    
+    return {
+        "destination": plan["destination"],
+        "duration": plan["duration"],
+        "user_preferences": plan["user_preferences"],
         "itinerary": itinerary
-    }
\ No newline at end of file
+    }
+
+@router.post("/trip-planner")
+async def plan_space_trip(
+    request: Request,
+    trip_data: dict = Body(...),
+    stream: bool = STREAM_QUERY,
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Generate a personalized space trip itinerary"""
+    plan = await prepare_trip_plan(trip_data, current_user, loaders)
+    
+    if stream:
+        return event_stream(
+            request,
+            stream_chat_completion(space_travel_question_messages(plan["prompt"])),
+            {"destination": plan["destination"], "duration": plan["duration"], "user_preferences": plan["user_preferences"]}
+        )
+    
+    return await generate_trip_plan(plan)
+
+@router.post("/trip-planner/jobs", status_code=status.HTTP_202_ACCEPTED)
+async def submit_trip_plan_job(
+    trip_data: dict = Body(...),
+    priority: int = Query(5, ge=0, le=9, description="Lower values run first"),
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Queue itinerary generation and return a job id to poll"""
+    plan = await prepare_trip_plan(trip_data, current_user, loaders)
+    dedup_key = (current_user["id"], plan["prompt"])
+    
+    try:
+        job = trip_plan_jobs.submit(current_user["id"], dedup_key, priority, generate_trip_plan, plan)
+    except QueueFullError:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Trip planner is busy, please retry shortly",
+            headers={"Retry-After": "5"},
+        )
+    
+    return job.to_dict()
+
+@router.get("/trip-planner/jobs/{job_id}")
+async def get_trip_plan_job(
+    job_id: str,
+    wait: float = Query(0, ge=0, le=30, description="Seconds to wait for the job to finish (long-poll)"),
+    current_user: dict = Depends(get_current_user)
+):
+    """Get the status and, once completed, the itinerary of a trip planner job"""
+    job = trip_plan_jobs.get(job_id)
+    
+    if not job or job.owner_id != current_user["id"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+    
+    if wait and not job.done.is_set():
+        await trip_plan_jobs.wait(job, wait)
+    
+    return job.to_dict()
@@ -0,0 +1,207 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+from ..config import settings
+
+class UpstreamError(Exception):
+    """The upstream call failed or timed out"""
+
+class UpstreamUnavailableError(UpstreamError):
+    """The circuit breaker is open; retry_after is the remaining cooldown in seconds"""
+
+    def __init__(self, retry_after: float):
+        super().__init__("AI assistant is temporarily unavailable")
+        self.retry_after = retry_after
+
+class UpstreamBusyError(UpstreamError):
+    """Too many calls are already waiting for an upstream slot"""
+
+    def __init__(self):
+        super().__init__("AI assistant is busy, please retry shortly")
+
+class CircuitBreaker:
+    """Opens when the failure rate over the last `window` calls reaches `failure_rate`.
+
+    While open, calls fail fast for `cooldown` seconds; then a single trial call
+    is let through (half-open) and its outcome closes or re-opens the breaker.
+    """
+
+    def __init__(self, failure_rate: float, min_calls: int, window: int, cooldown: float):
+        self.failure_rate = failure_rate
+        self.min_calls = min_calls
+        self.cooldown = cooldown
+        self._outcomes = deque(maxlen=window)  # True for success
+        self._opened_at = None
+        self._trial_in_flight = False
+        self.times_opened = 0
+
+    @property
+    def state(self):
+        if self._opened_at is None:
+            return "closed"
+        if time.monotonic() - self._opened_at < self.cooldown:
+            return "open"
+        return "half_open"
+
+    def retry_after(self) -> float:
+        if self._opened_at is None:
+            return 0.0
+        return max(0.0, self.cooldown - (time.monotonic() - self._opened_at))
+
+    def allow(self):
+        """Admit a call: "trial" for the half-open trial, "call" otherwise, None while open"""
+        state = self.state
+        if state == "closed":
+            return "call"
+        if state == "half_open" and not self._trial_in_flight:
+            self._trial_in_flight = True
+            return "trial"
+        return None
+
+    def cancel(self, admission: str):
+        """Give back an admitted call that never reached the upstream"""
+        if admission == "trial":
+            self._trial_in_flight = False
+
+    def record(self, admission: str, success: bool):
+        if admission == "trial":
+            self._trial_in_flight = False
+            if success:
+                self._opened_at = None
+                self._outcomes.clear()
+            else:
+                self._opened_at = time.monotonic()
+                self.times_opened += 1
+            return
+        if self._opened_at is not None:
+            # Admitted before the breaker opened; only the trial decides what happens next
+            return
+
+        self._outcomes.append(success)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.failure_rate:
+            self._opened_at = time.monotonic()
+            self.times_opened += 1
+
+    def stats(self):
+        return {
+            "state": self.state,
+            "recent_calls": len(self._outcomes),
+            "recent_failures": self._outcomes.count(False),
+            "times_opened": self.times_opened,
+            "retry_after": self.retry_after(),
+        }
+
+class UpstreamClient:
+    """Admission control for an upstream API.
+
+    At most max_concurrency calls run at once and at most max_queue wait for a
+    slot; beyond that calls are shed with UpstreamBusyError. Each call has a
+    deadline of `timeout` seconds and its outcome feeds the circuit breaker.
+    """
+
+    def __init__(self, max_concurrency: int, max_queue: int, timeout: float, breaker: CircuitBreaker):
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.timeout = timeout
+        self.breaker = breaker
+        self._semaphore = None
+        self.waiting = 0
+        self.in_flight = 0
+        self.calls = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.shed = 0
+        self.short_circuited = 0
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold an upstream slot; failures raised inside the block are recorded"""
+        admission = self.breaker.allow()
+        if admission is None:
+            self.short_circuited += 1
+            raise UpstreamUnavailableError(self.breaker.retry_after())
+
+        if self._semaphore is None:
+            # Created lazily so it binds to the server's event loop
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+        else:
+            if self.waiting >= self.max_queue:
+                self.shed += 1
+                self.breaker.cancel(admission)
+                raise UpstreamBusyError()
+
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._semaphore.acquire(), self.timeout)
+            except asyncio.TimeoutError:
+                self.shed += 1
+                self.breaker.cancel(admission)
+                raise UpstreamBusyError()
+            except asyncio.CancelledError:
+                self.breaker.cancel(admission)
+                raise
+            finally:
+                self.waiting -= 1
+
+        self.in_flight += 1
+        self.calls += 1
+        try:
+            yield
+        except Exception:
+            self.failures += 1
+            self.breaker.record(admission, False)
+            raise
+        except BaseException:
+            # Cancelled or closed by the caller, which says nothing about upstream health
+            self.breaker.cancel(admission)
+            raise
+        else:
+            self.breaker.record(admission, True)
+        finally:
+            self.in_flight -= 1
+            self._semaphore.release()
+
+    async def call(self, func, *args, **kwargs):
+        """Run func(*args, **kwargs) in a slot with the per-call deadline"""
+        async with self.slot():
+            try:
+                return await asyncio.wait_for(func(*args, **kwargs), self.timeout)
+            except asyncio.TimeoutError:
+                self.timeouts += 1
+                raise UpstreamError(f"AI assistant did not respond within {self.timeout:g} seconds")
+            except UpstreamError:
+                raise
+            except Exception as e:
+                raise UpstreamError(f"AI assistant request failed: {e}") from e
+
+    def stats(self):
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queue_depth": self.waiting,
+            "max_queue": self.max_queue,
+            "calls": self.calls,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "shed": self.shed,
+            "short_circuited": self.short_circuited,
+            "breaker": self.breaker.stats(),
+        }
+
+openai_upstream = UpstreamClient(
+    max_concurrency=settings.AI_MAX_CONCURRENCY,
+    max_queue=settings.AI_MAX_QUEUE,
+    timeout=settings.AI_TIMEOUT,
+    breaker=CircuitBreaker(
+        failure_rate=settings.AI_BREAKER_FAILURE_RATE,
+        min_calls=settings.AI_BREAKER_MIN_CALLS,
+        window=settings.AI_BREAKER_WINDOW,
+        cooldown=settings.AI_BREAKER_COOLDOWN,
+    ),
+)
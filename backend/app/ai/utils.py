@@ -1,11 +1,176 @@
+import asyncio
+import hashlib
+import json
+import os
+import re
+import time
+
 import openai
+from ..cache import AsyncTTLCache
 from ..config import settings
+from ..metrics import observe_call
+from .upstream import openai_upstream, UpstreamError
 
 # Set OpenAI API key
 openai.api_key = settings.OPENAI_API_KEY
+openai.api_base = settings.OPENAI_API_BASE
 
-async def generate_travel_recommendations(user_preferences, destination_id=None):
-    """Generate travel recommendations based on user preferences"""
+# Completions keyed by a hash of the normalised request
+response_cache = AsyncTTLCache(maxsize=settings.AI_CACHE_MAXSIZE, ttl=settings.AI_CACHE_TTL)
+
+ai_stats = {
+    "requests": 0,
+    "upstream_calls": 0,
+    "cost_usd": 0.0,
+    "cost_saved_usd": 0.0,
+}
+
+def _completion_cost(usage: dict) -> float:
+    return (
+        usage.get("prompt_tokens", 0) / 1000 * settings.AI_PROMPT_COST_PER_1K
+        + usage.get("completion_tokens", 0) / 1000 * settings.AI_COMPLETION_COST_PER_1K
+    )
+
+def _estimate_usage(messages, chunks: int) -> dict:
+    """Token usage of a streamed completion, which the API does not report.
+
+    Each streamed chunk carries about one token, and prompts run about four
+    characters per token.
+    """
+    return {
+        "prompt_tokens": sum(len(m["content"]) for m in messages) // 4,
+        "completion_tokens": chunks,
+        "estimated": True,
+    }
+
+def completion_cache_key(model, messages, temperature, max_tokens):
+    """Hash the request with whitespace collapsed so trivially different prompts share an entry"""
+    normalised = {
+        "model": model,
+        "temperature": temperature,
+        "max_tokens": max_tokens,
+        "messages": [
+            {"role": m["role"], "content": re.sub(r"\s+", " ", m["content"]).strip()}
+            for m in messages
+        ],
+    }
+    digest = hashlib.sha256(json.dumps(normalised, sort_keys=True).encode()).hexdigest()
+    return ("completion", digest)
+
+async def create_chat_completion(messages, model="gpt-4o", temperature=0.7, max_tokens=800):
+    """Return the completion text for messages, served from the response cache when possible.
+
+    Concurrent identical requests share one upstream call, which goes through
+    openai_upstream admission control. Failures raise UpstreamError and are not cached.
+    """
+    ai_stats["requests"] += 1
+    called_upstream = False
+    
+    async def fetch():
+        nonlocal called_upstream
+        called_upstream = True
+        ai_stats["upstream_calls"] += 1
+        with observe_call("openai"):
+            response = await openai_upstream.call(
+                openai.ChatCompletion.acreate,
+                model=model,
+                messages=messages,
+                temperature=temperature,
+                max_tokens=max_tokens
+            )
+        usage = dict(response.get("usage") or {})
+        ai_stats["cost_usd"] += _completion_cost(usage)
+        return {"content": response.choices[0].message.content, "usage": usage}
+    
+    key = completion_cache_key(model, messages, temperature, max_tokens)
+    result = await response_cache.get_or_load(key, fetch)
+    if not called_upstream:
+        ai_stats["cost_saved_usd"] += _completion_cost(result["usage"])
+    return result["content"]
+
+def get_ai_stats():
+    stats = {**ai_stats, "cache": response_cache.stats()}
+    stats["hit_rate"] = 1 - ai_stats["upstream_calls"] / ai_stats["requests"] if ai_stats["requests"] else 0.0
+    return stats
+
+def load_response_cache():
+    """Restore the response cache from AI_CACHE_PATH, if configured"""
+    if not settings.AI_CACHE_PATH or not os.path.exists(settings.AI_CACHE_PATH):
+        return
+    with open(settings.AI_CACHE_PATH) as f:
+        saved = json.load(f)
+    elapsed = time.time() - saved["saved_at"]
+    response_cache.load((tuple(key), value, ttl - elapsed) for key, value, ttl in saved["entries"])
+
+def save_response_cache():
+    """Write the response cache to AI_CACHE_PATH, if configured"""
+    if not settings.AI_CACHE_PATH:
+        return
+    tmp_path = f"{settings.AI_CACHE_PATH}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"saved_at": time.time(), "entries": response_cache.dump()}, f)
+    os.replace(tmp_path, settings.AI_CACHE_PATH)
+
+async def stream_chat_completion(messages, model="gpt-4o", temperature=0.7, max_tokens=800):
+    """Yield the completion text for messages as it is generated.
+
+    A cached completion is yielded as a single chunk. A stream read to the end
+    is added to the response cache with an estimated usage; closing the
+    generator early aborts the upstream request. The upstream must send the
+    first and each following chunk within AI_TIMEOUT seconds, or the stream
+    fails with UpstreamError and counts as a failure for the circuit breaker.
+    """
+    ai_stats["requests"] += 1
+    key = completion_cache_key(model, messages, temperature, max_tokens)
+    cached = response_cache.lookup(key)
+    if cached is not None:
+        ai_stats["cost_saved_usd"] += _completion_cost(cached["usage"])
+        yield cached["content"]
+        return
+    
+    ai_stats["upstream_calls"] += 1
+    parts = []
+    # The upstream slot is held for the whole stream
+    async with openai_upstream.slot():
+        with observe_call("openai"):
+            try:
+                response = await asyncio.wait_for(
+                    openai.ChatCompletion.acreate(
+                        model=model,
+                        messages=messages,
+                        temperature=temperature,
+                        max_tokens=max_tokens,
+                        stream=True
+                    ),
+                    openai_upstream.timeout
+                )
+            except asyncio.TimeoutError:
+                openai_upstream.timeouts += 1
+                raise UpstreamError("AI assistant did not respond in time")
+            chunks = 0
+            try:
+                while True:
+                    try:
+                        chunk = await asyncio.wait_for(response.__anext__(), openai_upstream.timeout)
+                    except StopAsyncIteration:
+                        break
+                    except asyncio.TimeoutError:
+                        openai_upstream.timeouts += 1
+                        raise UpstreamError("AI assistant stopped responding")
+                    content = chunk.choices[0].delta.get("content")
+                    if content:
+                        chunks += 1
+                        parts.append(content)
+                        yield content
+            finally:
+                await response.aclose()
+    
+    usage = _estimate_usage(messages, chunks)
+    ai_stats["cost_usd"] += _completion_cost(usage)
+    response_cache.set(key, {"content": "".join(parts), "usage": usage})
+
+def travel_recommendations_messages(user_preferences, destination_id=None):
+    """Build the chat messages for travel recommendations"""
     # Build prompt for GPT-4o
     prompt = f"You are an AI travel assistant for a space tourism company based in Dubai. "
     prompt += f"Generate personalized recommendations for a customer with the following preferences:\n\n"
@@ -19,24 +184,13 @@ async def generate_travel_recommendations(user_preferences, destination_id=None)
     
     prompt += "\n\nProvide recommendations for accommodations, activities, and travel tips."
     
-    # Call OpenAI API
-    try:
-        response = await openai.ChatCompletion.acreate(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful space travel assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
-        
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error generating recommendations: {str(e)}"
+    return [
+        {"role": "system", "content": "You are a helpful space travel assistant."},
+        {"role": "user", "content": prompt}
+    ]
 
-async def generate_packing_list(destination_id, duration, user_preferences=None):
-    """Generate a packing list based on destination and trip duration"""
+def packing_list_messages(destination_id, duration, user_preferences=None):
+    """Build the chat messages for a packing list"""
     # Build prompt for GPT-4o
     prompt = f"You are an AI travel assistant for a space tourism company based in Dubai. "
     prompt += f"Generate a comprehensive packing list for a {duration}-day space trip to destination ID: {destination_id}.\n\n"
@@ -48,24 +202,13 @@ async def generate_packing_list(destination_id, duration, user_preferences=None)
     
     prompt += "\nThe list should include essential items, recommended clothing, special equipment for space travel, and any destination-specific items."
     
-    # Call OpenAI API
-    try:
-        response = await openai.ChatCompletion.acreate(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are a helpful space travel assistant."},
-                {"role": "user", "content": prompt}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
-        
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error generating packing list: {str(e)}"
+    return [
+        {"role": "system", "content": "You are a helpful space travel assistant."},
+        {"role": "user", "content": prompt}
+    ]
 
-async def answer_space_travel_question(question, user_context=None):
-    """Answer a space travel related question using GPT-4o"""
+def space_travel_question_messages(question, user_context=None):
+    """Build the chat messages for a space travel question"""
     # Build system prompt with context
     system_prompt = "You are an AI travel assistant for a space tourism company based in Dubai. "
     system_prompt += "You specialize in space travel knowledge, safety procedures, and customer support. "
@@ -76,18 +219,24 @@ async def answer_space_travel_question(question, user_context=None):
         for key, value in user_context.items():
             system_prompt += f"- {key}: {value}\n"
     
+    return [
+        {"role": "system", "content": system_prompt},
+        {"role": "user", "content": question}
+    ]
+
+# The generate_* helpers raise UpstreamError subclasses; app.main maps them to 502/503/429
+
+async def generate_travel_recommendations(user_preferences, destination_id=None):
+    """Generate travel recommendations based on user preferences"""
+    # Call OpenAI API
+    return await create_chat_completion(travel_recommendations_messages(user_preferences, destination_id))
+
+async def generate_packing_list(destination_id, duration, user_preferences=None):
+    """Generate a packing list based on destination and trip duration"""
+    # Call OpenAI API
+    return await create_chat_completion(packing_list_messages(destination_id, duration, user_preferences))
+
+async def answer_space_travel_question(question, user_context=None):
+    """Answer a space travel related question using GPT-4o"""
     # Call OpenAI API
-    try:
-        response = await openai.ChatCompletion.acreate(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": question}
-            ],
-            temperature=0.7,
-            max_tokens=800
-        )
-        
-        return response.choices[0].message.content
-    except Exception as e:
-        return f"Error answering question: {str(e)}"
\ No newline at end of file
+    return await create_chat_completion(space_travel_question_messages(question, user_context))
@@ -5,7 +5,7 @@ from datetime import timedelta
 from ..config import settings
 from ..database import get_user_by_email, create_user, update_user
 from .models import UserCreate, UserLogin, UserResponse, Token, UserPreferences
-from .utils import get_password_hash, verify_password, create_access_token, get_current_user
+from .utils import get_password_hash, verify_and_update_password, create_access_token, get_current_user
 
 router = APIRouter()
 
@@ -21,7 +21,7 @@ async def register(user_data: UserCreate):
         )
     
     # Hash the password
-    hashed_password = get_password_hash(user_data.password)
+    hashed_password = await get_password_hash(user_data.password)
     
     # Create user in the database
     new_user = {
@@ -61,13 +61,18 @@ async def login(form_data: OAuth2PasswordRequestForm = Depends()):
         )
     
     # Verify password
-    if not verify_password(form_data.password, user["password_hash"]):
+    valid, new_hash = await verify_and_update_password(form_data.password, user["password_hash"])
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Rehash with the current cost parameters if they changed since the password was set
+    if new_hash:
+        await update_user(user["id"], {"password_hash": new_hash})
+    
     # Create access token
     access_token_expires = timedelta(minutes=settings.JWT_EXPIRATION_MINUTES)
     access_token = create_access_token(
@@ -1,25 +1,92 @@
+import asyncio
+import hashlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from fastapi import Depends, HTTPException, status
+from fastapi import Depends, Header, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 
+from ..cache import AsyncTTLCache
 from ..config import settings
 from ..database import get_user_by_id
 from .models import TokenData
 
 # Password hashing
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+class PasswordHashPool:
+    """Runs bcrypt off the event loop on a bounded thread pool.
+
+    bcrypt releases the GIL, so threads hash in parallel; calls beyond the
+    worker count wait in the executor queue and are counted in stats().
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.active = 0
+        self.completed = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self.total_run = 0.0
+
+    def _call(self, submitted, func, args):
+        started = time.monotonic()
+        with self._lock:
+            self.queued -= 1
+            self.active += 1
+            wait = started - submitted
+            self.total_wait += wait
+            self.max_wait = max(self.max_wait, wait)
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.active -= 1
+                self.completed += 1
+                self.total_run += time.monotonic() - started
+
+    async def run(self, func, *args):
+        with self._lock:
+            self.queued += 1
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, time.monotonic(), func, args)
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "queued": self.queued,
+                "active": self.active,
+                "completed": self.completed,
+                "avg_wait_ms": self.total_wait / self.completed * 1000 if self.completed else 0.0,
+                "max_wait_ms": self.max_wait * 1000,
+                "avg_run_ms": self.total_run / self.completed * 1000 if self.completed else 0.0,
+            }
+
+password_pool = PasswordHashPool(settings.PASSWORD_HASH_WORKERS)
 
 # OAuth2 scheme for token authentication
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+# Verified tokens (by SHA-256) -> user id, each entry expiring with its token
+token_cache = AsyncTTLCache(maxsize=settings.TOKEN_CACHE_MAXSIZE, ttl=settings.JWT_EXPIRATION_MINUTES * 60)
+
+async def verify_password(plain_password, hashed_password):
+    return await password_pool.run(pwd_context.verify, plain_password, hashed_password)
 
-def get_password_hash(password):
-    return pwd_context.hash(password)
+async def verify_and_update_password(plain_password, hashed_password):
+    """Verify a password, returning (valid, new_hash); new_hash is set when the stored hash uses outdated parameters"""
+    return await password_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash(password):
+    return await password_pool.run(pwd_context.hash, password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -46,25 +113,40 @@ async def get_current_user(token: str = Depends(oauth2_scheme)):
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(
-            token, 
-            settings.JWT_SECRET, 
-            algorithms=[settings.JWT_ALGORITHM]
-        )
-        user_id: str = payload.get("sub")
-        
-        if user_id is None:
+    token_key = hashlib.sha256(token.encode()).hexdigest()
+    token_data = token_cache.lookup(token_key)
+    
+    if token_data is None:
+        try:
+            payload = jwt.decode(
+                token, 
+                settings.JWT_SECRET, 
+                algorithms=[settings.JWT_ALGORITHM]
+            )
+            user_id: str = payload.get("sub")
+            
+            if user_id is None:
+                raise credentials_exception
+            
+            token_data = TokenData(user_id=user_id)
+            
+        except JWTError:
             raise credentials_exception
         
-        token_data = TokenData(user_id=user_id)
-        
-    except JWTError:
-        raise credentials_exception
+        if payload.get("exp"):
+            token_cache.set(token_key, token_data, ttl=payload["exp"] - time.time())
     
     user = await get_user_by_id(token_data.user_id)
     
     if user is None:
         raise credentials_exception
     
-    return user
\ No newline at end of file
+    return user
+
+async def require_admin(x_admin_key: Optional[str] = Header(None)):
+    """Allow the request only if it carries the configured X-Admin-Key header"""
+    if not settings.ADMIN_API_KEY or x_admin_key != settings.ADMIN_API_KEY:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin access required"
+        )
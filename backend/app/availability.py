@@ -0,0 +1,213 @@
+import time
+import uuid
+from datetime import date, datetime
+
+import numpy as np
+
+from .config import settings
+from .database import get_active_bookings
+
+def booking_nights(booking: dict) -> tuple:
+    """Ordinal of the first night and of the night after the last one (the return day)"""
+    return (
+        datetime.fromisoformat(booking["departure_date"]).date().toordinal(),
+        datetime.fromisoformat(booking["return_date"]).date().toordinal(),
+    )
+
+def departure_day(booking: dict) -> tuple:
+    """A package seat is only taken on the launch day"""
+    start = datetime.fromisoformat(booking["departure_date"]).date().toordinal()
+    return start, start + 1
+
+def occupies(booking: dict) -> bool:
+    return bool(booking) and booking.get("status") != "Cancelled"
+
+class Calendar:
+    """Travelers using one accommodation or package for every day, as a day-indexed array.
+
+    Bookings are kept by id so they can be removed or moved without rebuilding
+    the calendar from the database.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self.origin = date.today().toordinal()
+        self.occupancy = np.zeros(0, dtype=np.int32)
+        self.bookings = {}  # booking id -> (first night, return day, travelers)
+        self.loaded_at = time.monotonic()
+
+    def _grow(self, start: int, end: int):
+        if start < self.origin:
+            self.occupancy = np.concatenate([np.zeros(self.origin - start, dtype=np.int32), self.occupancy])
+            self.origin = start
+        if end > self.origin + len(self.occupancy):
+            self.occupancy = np.concatenate([
+                self.occupancy, np.zeros(end - self.origin - len(self.occupancy), dtype=np.int32)
+            ])
+
+    def add(self, booking_id: str, start: int, end: int, travelers: int):
+        self.remove(booking_id)
+        if end <= start:
+            return
+        self._grow(start, end)
+        self.occupancy[start - self.origin:end - self.origin] += travelers
+        self.bookings[booking_id] = (start, end, travelers)
+
+    def remove(self, booking_id: str):
+        booking = self.bookings.pop(booking_id, None)
+        if booking:
+            start, end, travelers = booking
+            self.occupancy[start - self.origin:end - self.origin] -= travelers
+
+    def between(self, start: int, end: int, exclude: str = None) -> np.ndarray:
+        """Occupancy for the nights in [start, end), leaving out booking `exclude`.
+
+        Nights outside the calendar are empty.
+        """
+        nights = np.zeros(max(end - start, 0), dtype=np.int32)
+        lo, hi = max(start, self.origin), min(end, self.origin + len(self.occupancy))
+        if lo < hi:
+            nights[lo - start:hi - start] = self.occupancy[lo - self.origin:hi - self.origin]
+        if exclude in self.bookings:
+            booked_start, booked_end, travelers = self.bookings[exclude]
+            lo, hi = max(start, booked_start), min(end, booked_end)
+            if lo < hi:
+                nights[lo - start:hi - start] -= travelers
+        return nights
+
+def stay_starts(free: np.ndarray, nights: int) -> np.ndarray:
+    """For a (calendars, days) free-night matrix, whether a stay of `nights` can start on each day"""
+    runs = np.concatenate([np.zeros((free.shape[0], 1), dtype=np.int32), np.cumsum(free, axis=1, dtype=np.int32)], axis=1)
+    return runs[:, nights:] - runs[:, :-nights] == nights
+
+class AvailabilityIndex:
+    """Calendars built from the bookings table, one per row referenced by `column`.
+
+    Calendars are loaded on first use, in one query for all missing rows, and
+    then kept current by apply() as bookings change. They are reloaded after
+    `refresh` seconds to pick up bookings made by other processes. `days`
+    maps a booking to the [start, end) day ordinals it occupies.
+
+    Changes applied while a load is in flight are replayed onto the loaded
+    calendars, as are reservations for bookings still being written, so a
+    reload never drops places that are already taken.
+    """
+
+    def __init__(self, column: str, days, refresh: float):
+        self.column = column
+        self.days = days
+        self.refresh = refresh
+        self._calendars = {}
+        self._pending = {}  # reservation id -> booking not yet written
+        self._changes = []  # (before, after) applied while loads are in flight
+        self._loads_in_flight = 0
+        self.loads = 0
+
+    async def calendars(self, rows: list) -> dict:
+        """Calendars for accommodation or package rows, keyed by id"""
+        now = time.monotonic()
+        calendars = {}
+        missing = []
+        for row in rows:
+            calendar = self._calendars.get(row["id"])
+            if calendar is None or now - calendar.loaded_at > self.refresh:
+                missing.append(row)
+            else:
+                calendars[row["id"]] = calendar
+
+        if missing:
+            changes = self._changes
+            replay_from = len(changes)
+            self._loads_in_flight += 1
+            try:
+                bookings = await get_active_bookings(self.column, [r["id"] for r in missing], date.today().isoformat())
+            finally:
+                self._loads_in_flight -= 1
+                if not self._loads_in_flight:
+                    self._changes = []
+
+            loaded = {r["id"]: Calendar(r["capacity"]) for r in missing}
+            for booking in bookings:
+                loaded[booking[self.column]].add(booking["id"], *self.days(booking), booking["travelers"])
+            for before, after in changes[replay_from:]:
+                self._move(loaded, before, after)
+            for booking in self._pending.values():
+                self._move(loaded, None, booking)
+
+            self.loads += 1
+            self._calendars.update(loaded)
+            calendars.update(loaded)
+
+        return calendars
+
+    def _move(self, calendars: dict, before: dict = None, after: dict = None):
+        if occupies(before) and before[self.column] in calendars:
+            calendars[before[self.column]].remove(before["id"])
+        if occupies(after) and after[self.column] in calendars:
+            calendars[after[self.column]].add(after["id"], *self.days(after), after["travelers"])
+
+    def apply(self, before: dict = None, after: dict = None):
+        """Move a booking from its previous state to its new one (either may be None)"""
+        if self._loads_in_flight:
+            self._changes.append((before, after))
+        self._move(self._calendars, before, after)
+
+    def reserve(self, booking: dict) -> str:
+        """Hold the booking's places until release(); returns the reservation id"""
+        reservation_id = f"pending-{uuid.uuid4()}"
+        self._pending[reservation_id] = {**booking, "id": reservation_id}
+        self.apply(after=self._pending[reservation_id])
+        return reservation_id
+
+    def release(self, reservation_id: str):
+        self.apply(before=self._pending.pop(reservation_id))
+
+    def invalidate(self, row_id: str = None):
+        if row_id is None:
+            self._calendars.clear()
+        else:
+            self._calendars.pop(row_id, None)
+
+    async def remaining(self, row: dict, start: date, end: date, exclude: str = None) -> np.ndarray:
+        """Travelers that can still be booked on the row for each day in [start, end)"""
+        calendar = (await self.calendars([row]))[row["id"]]
+        return calendar.capacity - calendar.between(start.toordinal(), end.toordinal(), exclude)
+
+    async def fits(self, row: dict, booking: dict) -> bool:
+        """Whether the booking's travelers fit on every day it occupies, ignoring its own current use"""
+        start, end = self.days(booking)
+        remaining = await self.remaining(row, date.fromordinal(start), date.fromordinal(end), booking.get("id"))
+        return bool((remaining >= booking["travelers"]).all())
+
+    async def find_stays(self, accommodations: list, start: date, end: date, nights: int, travelers: int) -> dict:
+        """Check-in dates in [start, end - nights] with `nights` consecutive nights free for the party.
+
+        Returns accommodation id -> list of check-in dates, omitting
+        accommodations with no such stay.
+        """
+        days = end.toordinal() - start.toordinal()
+        if not accommodations or nights < 1 or days < nights:
+            return {}
+
+        calendars = await self.calendars(accommodations)
+        ids = [a["id"] for a in accommodations]
+        occupancy = np.stack([calendars[i].between(start.toordinal(), end.toordinal()) for i in ids])
+        capacity = np.array([calendars[i].capacity for i in ids], dtype=np.int32)[:, None]
+        starts = stay_starts(occupancy + travelers <= capacity, nights)
+
+        stays = {}
+        for row, offsets in zip(ids, (np.flatnonzero(s) for s in starts)):
+            if len(offsets):
+                stays[row] = [date.fromordinal(start.toordinal() + int(o)) for o in offsets]
+        return stays
+
+    def stats(self):
+        return {
+            "calendars": len(self._calendars),
+            "bookings": sum(len(c.bookings) for c in self._calendars.values()),
+            "pending": len(self._pending),
+            "loads": self.loads,
+        }
+
+availability_index = AvailabilityIndex("accommodation_id", booking_nights, settings.AVAILABILITY_REFRESH)
+package_seats = AvailabilityIndex("package_id", departure_day, settings.AVAILABILITY_REFRESH)
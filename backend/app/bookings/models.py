@@ -11,7 +11,10 @@ class BookingCreate(BaseModel):
     package_id: str
     travelers: int
     special_requests: Optional[str] = None
-    total_price: float
+    total_price: Optional[float] = None  # Ignored; the price is quoted server-side
+
+class BulkBookingCreate(BaseModel):
+    bookings: List[BookingCreate]
 
 class BookingResponse(BaseModel):
     id: str
@@ -1,25 +1,53 @@
-from fastapi import APIRouter, HTTPException, status, Depends, Query
+import asyncio
+from fastapi import APIRouter, HTTPException, status, Depends, Query, Header, Response
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 from datetime import datetime, timedelta
 
 from ..auth.utils import get_current_user
+from ..config import settings
 from ..database import (
-    create_booking, get_bookings_by_user_id, get_booking_by_id,
-    update_booking, delete_booking, get_destination_by_id,
-    get_accommodation_by_id, get_package_by_id
+    create_booking, create_booking_rows, get_bookings_by_user_id, get_booking_by_id,
+    update_booking, delete_booking, BOOKING_SORTS
 )
-from .models import BookingCreate, BookingResponse, BookingDetail, BookingUpdate
+from ..idempotency import booking_idempotency, request_fingerprint, IdempotencyKeyReusedError
+from ..inventory import inventory, CapacityError
+from ..loaders import Loaders, get_loaders
+from ..pagination import encode_cursor, decode_cursor
+from ..projection import FIELDS_QUERY, select_columns
+from ..pricing import quote
+from .models import BookingCreate, BulkBookingCreate, BookingResponse, BookingDetail, BookingUpdate
 
 router = APIRouter()
 
-@router.post("/", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
-async def create_new_booking(
-    booking_data: BookingCreate,
-    current_user: dict = Depends(get_current_user)
-):
-    """Create a new booking"""
+# Booking fields that change its price
+PRICED_FIELDS = {"departure_date", "return_date", "accommodation_id", "package_id", "travelers"}
+
+def get_duration(departure_date: str, return_date: str) -> int:
+    """Nights between departure and return.
+
+    Stored dates come back from PostgREST with a timezone offset while request
+    dates may be plain, so only the calendar dates are compared.
+    """
+    return (datetime.fromisoformat(return_date).date() - datetime.fromisoformat(departure_date).date()).days
+
+async def get_booking_references(booking: dict, loaders: Loaders):
+    """Fetch the destination, accommodation and package of a booking concurrently"""
+    return await asyncio.gather(
+        loaders.destinations.load(booking["destination_id"]),
+        loaders.accommodations.load(booking["accommodation_id"]),
+        loaders.packages.load(booking["package_id"]),
+    )
+
+async def prepare_booking(booking_data: BookingCreate, current_user: dict, loaders: Loaders):
+    """Validate and price a new booking; returns the row to insert, its accommodation and its package"""
+    destination, accommodation, package = await asyncio.gather(
+        loaders.destinations.load(booking_data.destination_id),
+        loaders.accommodations.load(booking_data.accommodation_id),
+        loaders.packages.load(booking_data.package_id),
+    )
+    
     # Verify destination exists
-    destination = await get_destination_by_id(booking_data.destination_id)
     if not destination:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -27,7 +55,6 @@ async def create_new_booking(
         )
     
     # Verify accommodation exists and belongs to the selected destination
-    accommodation = await get_accommodation_by_id(booking_data.accommodation_id)
     if not accommodation:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -41,7 +68,6 @@ async def create_new_booking(
         )
     
     # Verify package exists
-    package = await get_package_by_id(booking_data.package_id)
     if not package:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -55,12 +81,41 @@ async def create_new_booking(
             detail="Cannot create booking for another user"
         )
     
-    # Create booking with status "Confirmed"
+    try:
+        duration = get_duration(booking_data.departure_date, booking_data.return_date)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Dates must be in ISO format"
+        )
+    
+    if duration < 1 or booking_data.travelers < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Return date must be after departure and travelers must be positive"
+        )
+    
+    # Create booking with status "Confirmed" at the server-side price
     new_booking_data = booking_data.dict()
+    new_booking_data["total_price"] = quote(package, accommodation, destination, duration, booking_data.travelers)["total"]
     new_booking_data["status"] = "Confirmed"
     new_booking_data["created_at"] = datetime.now().isoformat()
     
-    created_booking = await create_booking(new_booking_data)
+    return new_booking_data, accommodation, package
+
+async def place_booking(booking_data: BookingCreate, current_user: dict, loaders: Loaders):
+    """Validate, price and write a new booking"""
+    new_booking_data, accommodation, package = await prepare_booking(booking_data, current_user, loaders)
+    
+    try:
+        created_booking = await inventory.book(
+            new_booking_data, accommodation, package, lambda: create_booking(new_booking_data)
+        )
+    except CapacityError as e:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=str(e)
+        )
     
     if not created_booking:
         raise HTTPException(
@@ -70,24 +125,166 @@ async def create_new_booking(
     
     return created_booking
 
+@router.post("/", response_model=BookingResponse, status_code=status.HTTP_201_CREATED)
+async def create_new_booking(
+    booking_data: BookingCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Retries with the same key return the original booking"),
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Create a new booking"""
+    if not idempotency_key:
+        return await place_booking(booking_data, current_user, loaders)
+    
+    try:
+        booking, replayed = await booking_idempotency.run(
+            (current_user["id"], idempotency_key),
+            # total_price is ignored and recomputed, so a retry may differ in it
+            request_fingerprint(booking_data.dict(exclude={"total_price"})),
+            lambda: place_booking(booking_data, current_user, loaders)
+        )
+    except IdempotencyKeyReusedError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different booking request"
+        )
+    
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    
+    return booking
+
+@router.post("/bulk", response_model=List[BookingResponse], status_code=status.HTTP_201_CREATED)
+async def create_bookings(
+    bulk: BulkBookingCreate,
+    response: Response,
+    idempotency_key: Optional[str] = Header(None, max_length=255, description="Retries with the same key return the original bookings"),
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
+):
+    """Create a group of bookings at once; either every booking is created or none is.
+    
+    When any booking is invalid or does not fit, the error detail lists the
+    outcome of each booking by index.
+    """
+    if not bulk.bookings or len(bulk.bookings) > settings.BULK_BOOKING_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Please provide between 1 and {settings.BULK_BOOKING_MAX} bookings"
+        )
+    
+    if not idempotency_key:
+        return await place_bookings(bulk, current_user, loaders)
+    
+    try:
+        bookings, replayed = await booking_idempotency.run(
+            (current_user["id"], "bulk", idempotency_key),
+            request_fingerprint(bulk.dict(exclude={"bookings": {"__all__": {"total_price"}}})),
+            lambda: place_bookings(bulk, current_user, loaders)
+        )
+    except IdempotencyKeyReusedError:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used for a different booking request"
+        )
+    
+    if replayed:
+        response.headers["Idempotent-Replayed"] = "true"
+    
+    return bookings
+
+async def place_bookings(bulk: BulkBookingCreate, current_user: dict, loaders: Loaders):
+    """Validate, price and write a group of bookings with one lookup per table and one insert"""
+    # Loads issued together are batched by the loaders
+    prepared = await asyncio.gather(
+        *(prepare_booking(b, current_user, loaders) for b in bulk.bookings),
+        return_exceptions=True
+    )
+    
+    errors = {}
+    for index, result in enumerate(prepared):
+        if isinstance(result, HTTPException):
+            errors[index] = (result.status_code, result.detail)
+        elif isinstance(result, Exception):
+            raise result
+    
+    if not errors:
+        try:
+            created_bookings = await inventory.book_many(prepared, lambda: create_booking_rows([p[0] for p in prepared]))
+        except CapacityError as e:
+            errors = {i: (status.HTTP_409_CONFLICT, detail) for i, detail in e.failures.items()}
+    
+    if errors:
+        only_conflicts = all(code == status.HTTP_409_CONFLICT for code, _ in errors.values())
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT if only_conflicts else status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=[
+                {"index": i, "status": "error", "status_code": errors[i][0], "detail": errors[i][1]}
+                if i in errors else {"index": i, "status": "not_created"}
+                for i in range(len(bulk.bookings))
+            ]
+        )
+    
+    if len(created_bookings) != len(bulk.bookings):
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail="Failed to create bookings"
+        )
+    
+    return created_bookings
+
 @router.get("/", response_model=List[BookingResponse])
 async def get_user_bookings(
+    response: Response,
     current_user: dict = Depends(get_current_user),
-    status: Optional[str] = Query(None, description="Filter by booking status")
+    status: Optional[str] = Query(
+        None,
+        regex="(?i)^(confirmed|pending|cancelled)$",
+        description="Filter by booking status: confirmed, pending or cancelled (any case)"
+    ),
+    sort: str = Query(
+        "-created_at",
+        regex="^-?(created_at|departure_date|total_price)$",
+        description="Sort by created_at, departure_date or total_price, prefix with - for descending"
+    ),
+    limit: int = Query(50, ge=1, le=200, description="Maximum number of results"),
+    cursor: Optional[str] = Query(None, description="Value of X-Next-Cursor from the previous page"),
+    fields: Optional[str] = FIELDS_QUERY
 ):
-    """Get bookings for the current user"""
-    bookings = await get_bookings_by_user_id(current_user["id"])
-    
-    # Apply status filter if provided
-    if status:
-        bookings = [b for b in bookings if b["status"].lower() == status.lower()]
+    """Get bookings for the current user.
+    
+    Results are paginated; the X-Next-Cursor response header is set when more results exist.
+    """
+    sort_column, _ = BOOKING_SORTS[sort]
+    after = decode_cursor(cursor, (int, float) if sort_column == "total_price" else (str,)) if cursor else None
+    
+    bookings = await get_bookings_by_user_id(
+        current_user["id"],
+        # Statuses are stored capitalised ("Confirmed", "Cancelled")
+        status=status.capitalize() if status else None,
+        sort=sort,
+        limit=limit + 1,
+        after=after,
+        columns=select_columns(BookingResponse, fields, required=("id", sort_column)),
+    )
+    
+    if len(bookings) > limit:
+        bookings = bookings[:limit]
+        last = bookings[-1]
+        response.headers["X-Next-Cursor"] = encode_cursor(last[sort_column], last["id"])
+    
+    if fields:
+        # Sparse fieldsets would fail response model validation
+        return JSONResponse(bookings, headers=dict(response.headers))
     
     return bookings
 
 @router.get("/{booking_id}", response_model=BookingDetail)
 async def get_booking_details(
     booking_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get detailed information about a specific booking"""
     booking = await get_booking_by_id(booking_id)
@@ -106,13 +303,11 @@ async def get_booking_details(
         )
     
     # Get additional information for the booking
-    destination = await get_destination_by_id(booking["destination_id"])
-    accommodation = await get_accommodation_by_id(booking["accommodation_id"])
-    package = await get_package_by_id(booking["package_id"])
+    destination, accommodation, package = await get_booking_references(booking, loaders)
     
     # Calculate countdown to departure
     departure_date = datetime.fromisoformat(booking["departure_date"])
-    today = datetime.now()
+    today = datetime.now(departure_date.tzinfo)
     countdown = (departure_date - today).days
     
     # Create enhanced booking detail
@@ -156,7 +351,8 @@ async def get_booking_details(
 async def update_user_booking(
     booking_id: str,
     booking_update: BookingUpdate,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Update an existing booking"""
     booking = await get_booking_by_id(booking_id)
@@ -176,7 +372,7 @@ async def update_user_booking(
     
     # If accommodation is being updated, verify it exists and is at the correct destination
     if booking_update.accommodation_id:
-        accommodation = await get_accommodation_by_id(booking_update.accommodation_id)
+        accommodation = await loaders.accommodations.load(booking_update.accommodation_id)
         if not accommodation:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
@@ -191,18 +387,47 @@ async def update_user_booking(
     
     # If package is being updated, verify it exists
     if booking_update.package_id:
-        package = await get_package_by_id(booking_update.package_id)
+        package = await loaders.packages.load(booking_update.package_id)
         if not package:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="New package not found"
             )
     
-    # Update the booking
+    # Update the booking, re-pricing it and re-checking capacity when anything priced has changed
     update_data = booking_update.dict(exclude_unset=True)
     update_data["updated_at"] = datetime.now().isoformat()
+    write = lambda: update_booking(booking_id, update_data)
     
-    updated_booking = await update_booking(booking_id, update_data)
+    if PRICED_FIELDS & update_data.keys() and booking["status"] != "Cancelled":
+        updated = {**booking, **update_data}
+        try:
+            duration = get_duration(updated["departure_date"], updated["return_date"])
+        except (TypeError, ValueError):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Dates must be in ISO format"
+            )
+        
+        if duration < 1 or updated["travelers"] < 1:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Return date must be after departure and travelers must be positive"
+            )
+        
+        destination, accommodation, package = await get_booking_references(updated, loaders)
+        update_data["total_price"] = quote(package, accommodation, destination, duration, updated["travelers"])["total"]
+        
+        try:
+            updated_booking = await inventory.book(updated, accommodation, package, write, previous=booking)
+        except CapacityError as e:
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail=str(e)
+            )
+    else:
+        updated_booking = await write()
+        inventory.record(booking, updated_booking)
     
     if not updated_booking:
         raise HTTPException(
@@ -235,13 +460,15 @@ async def cancel_booking(
     
     # Instead of deleting, we update the status to "Cancelled"
     await update_booking(booking_id, {"status": "Cancelled", "updated_at": datetime.now().isoformat()})
+    inventory.record(booking)
     
     return None
 
 @router.get("/{booking_id}/invoice")
 async def get_booking_invoice(
     booking_id: str,
-    current_user: dict = Depends(get_current_user)
+    current_user: dict = Depends(get_current_user),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Get invoice for a booking"""
     booking = await get_booking_by_id(booking_id)
@@ -260,14 +487,10 @@ async def get_booking_invoice(
         )
     
     # Get additional information
-    destination = await get_destination_by_id(booking["destination_id"])
-    accommodation = await get_accommodation_by_id(booking["accommodation_id"])
-    package = await get_package_by_id(booking["package_id"])
+    destination, accommodation, package = await get_booking_references(booking, loaders)
     
-    # Calculate duration
-    departure_date = datetime.fromisoformat(booking["departure_date"])
-    return_date = datetime.fromisoformat(booking["return_date"])
-    duration = (return_date - departure_date).days
+    duration = get_duration(booking["departure_date"], booking["return_date"])
+    price = quote(package, accommodation, destination, duration, booking["travelers"])
     
     # Create invoice
     invoice = {
@@ -288,13 +511,7 @@ async def get_booking_invoice(
             "duration": duration,
             "travelers": booking["travelers"]
         },
-        "costs": {
-            "base_package": package["price"] * booking["travelers"],
-            "accommodation": accommodation["price_per_night"] * duration * booking["travelers"],
-            "destination_fee": 500 * booking["travelers"],  # Example fee
-            "space_visa": 300 * booking["travelers"],  # Example fee
-            "insurance": 200 * booking["travelers"]  # Example fee
-        },
+        "costs": price["costs"],
         "total": booking["total_price"],
         "payment_status": "Paid"
     }
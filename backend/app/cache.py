@@ -0,0 +1,148 @@
+import asyncio
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from .config import settings
+
+class AsyncTTLCache:
+    """Size-bounded LRU cache with per-entry TTL and single-flight loading.
+
+    Values are shared between callers, so they must be treated as read-only.
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, value)
+        self._inflight = {}  # key -> asyncio.Task
+        self._generation = 0  # Bumped on invalidation so in-flight loads are not stored
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        entry = self._data.get(key)
+        if entry is None:
+            return default
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return default
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key, value, ttl: float = None):
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def lookup(self, key):
+        """Like get(), but counted in the hit/miss statistics"""
+        value = self.get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    async def get_or_load(self, key, loader):
+        """Return the cached value for key, calling loader() once on a miss.
+
+        Concurrent misses for the same key share a single loader call.
+        None results are not cached.
+        """
+        value = self.lookup(key)
+        if value is not None:
+            return value
+
+        generation = self._generation
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(loader())
+            self._inflight[key] = task
+            task.add_done_callback(lambda done: self._forget_inflight(key, done))
+        value = await asyncio.shield(task)
+        if value is not None and generation == self._generation and key not in self._data:
+            self.set(key, value)
+        return value
+
+    def _forget_inflight(self, key, task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+
+    def invalidate(self, key):
+        self._generation += 1
+        self._inflight.pop(key, None)
+        self._data.pop(key, None)
+
+    def invalidate_prefix(self, prefix):
+        """Drop every entry whose tuple key starts with the given element"""
+        self._generation += 1
+        for key in [k for k in self._inflight if k[0] == prefix]:
+            del self._inflight[key]
+        for key in [k for k in self._data if k[0] == prefix]:
+            del self._data[key]
+
+    def clear(self):
+        self._generation += 1
+        self._inflight.clear()
+        self._data.clear()
+
+    def dump(self):
+        """Return live entries as (key, value, remaining ttl) for persistence"""
+        now = time.monotonic()
+        return [
+            (key, value, expires_at - now)
+            for key, (expires_at, value) in self._data.items()
+            if expires_at > now
+        ]
+
+    def load(self, entries):
+        for key, value, ttl in entries:
+            if ttl > 0:
+                self.set(key, value, ttl=ttl)
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+def cached(cache: AsyncTTLCache, table: str):
+    """Cache an async lookup under (table, function name, *args, *sorted kwargs)"""
+    def decorator(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            return await cache.get_or_load(wrapper.cache_key(*args, **kwargs), lambda: func(*args, **kwargs))
+        wrapper.cache_key = lambda *args, **kwargs: (table, func.__name__, *args, *sorted(kwargs.items()))
+        wrapper.uncached = func
+        return wrapper
+    return decorator
+
+# Shared cache for the rarely-changing catalog tables
+catalog_cache = AsyncTTLCache(
+    maxsize=settings.CATALOG_CACHE_MAXSIZE,
+    ttl=settings.CATALOG_CACHE_TTL,
+)
+
+# Accommodation searches, one entry per filter, sort and page combination; kept apart
+# from the catalog so varied searches cannot evict hot by-id lookups
+search_cache = AsyncTTLCache(
+    maxsize=settings.SEARCH_CACHE_MAXSIZE,
+    ttl=settings.CATALOG_CACHE_TTL,
+)
+
+# Users looked up on every authenticated request; kept short-lived and refreshed on writes
+user_cache = AsyncTTLCache(
+    maxsize=settings.USER_CACHE_MAXSIZE,
+    ttl=settings.USER_CACHE_TTL,
+)
@@ -14,18 +14,96 @@ class Settings(BaseSettings):
     SUPABASE_URL: str = os.getenv("SUPABASE_URL", "")
     SUPABASE_KEY: str = os.getenv("SUPABASE_KEY", "")
     
+    # Storage backend: "postgrest" (the Supabase project above), or "memory" / "sqlite"
+    # for a local stand-in seeded with the sample data in database/schema.sql
+    DATABASE_BACKEND: str = os.getenv("DATABASE_BACKEND", "postgrest")
+    DATABASE_SQLITE_PATH: str = os.getenv("DATABASE_SQLITE_PATH", ":memory:")  # Database file, created and seeded when missing
+    DATABASE_LATENCY: float = float(os.getenv("DATABASE_LATENCY", "0"))  # Seconds added to each call on local backends
+    
+    # Database connection pool settings
+    DB_POOL_SIZE: int = int(os.getenv("DB_POOL_SIZE", "50"))  # Max open connections to PostgREST
+    DB_POOL_KEEPALIVE: int = int(os.getenv("DB_POOL_KEEPALIVE", "20"))  # Idle connections kept alive
+    DB_CONNECT_TIMEOUT: float = float(os.getenv("DB_CONNECT_TIMEOUT", "5"))  # Seconds
+    DB_POOL_TIMEOUT: float = float(os.getenv("DB_POOL_TIMEOUT", "5"))  # Seconds to wait for a free connection
+    DB_QUERY_TIMEOUT: float = float(os.getenv("DB_QUERY_TIMEOUT", "10"))  # Overall deadline per call in seconds
+    
+    # Query log settings (see /api/admin/queries)
+    QUERY_SLOW_THRESHOLD: float = float(os.getenv("QUERY_SLOW_THRESHOLD", "0.5"))  # Seconds before a call is logged as slow
+    QUERY_STATS_WINDOW: float = float(os.getenv("QUERY_STATS_WINDOW", "3600"))  # Seconds per aggregation window
+    QUERY_STATS_MAX_FINGERPRINTS: int = int(os.getenv("QUERY_STATS_MAX_FINGERPRINTS", "1000"))
+    QUERY_SLOW_LOG_SIZE: int = int(os.getenv("QUERY_SLOW_LOG_SIZE", "100"))  # Recent slow calls kept
+    
+    # Catalog cache settings (destinations, accommodations, packages)
+    CATALOG_CACHE_TTL: float = float(os.getenv("CATALOG_CACHE_TTL", "300"))  # Seconds
+    CATALOG_CACHE_MAXSIZE: int = int(os.getenv("CATALOG_CACHE_MAXSIZE", "1024"))  # Max cached lookups
+    SEARCH_CACHE_MAXSIZE: int = int(os.getenv("SEARCH_CACHE_MAXSIZE", "256"))  # Max cached accommodation searches
+    
+    # Authenticated user cache settings
+    USER_CACHE_TTL: float = float(os.getenv("USER_CACHE_TTL", "60"))  # Seconds a user row may be stale
+    USER_CACHE_MAXSIZE: int = int(os.getenv("USER_CACHE_MAXSIZE", "10000"))
+    TOKEN_CACHE_MAXSIZE: int = int(os.getenv("TOKEN_CACHE_MAXSIZE", "10000"))  # Decoded JWTs, kept until exp
+    
     # JWT settings
     JWT_SECRET: str = os.getenv("JWT_SECRET", "your-secret-key")
     JWT_ALGORITHM: str = "HS256"
     JWT_EXPIRATION_MINUTES: int = 60 * 24  # 24 hours
     
+    # Password hashing settings
+    BCRYPT_ROUNDS: int = int(os.getenv("BCRYPT_ROUNDS", "12"))  # Existing hashes are upgraded on login when changed
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", "4"))  # Concurrent bcrypt operations
+    
+    # Availability index settings
+    AVAILABILITY_REFRESH: float = float(os.getenv("AVAILABILITY_REFRESH", "300"))  # Seconds before a calendar is rebuilt from bookings
+    AVAILABILITY_MAX_DAYS: int = int(os.getenv("AVAILABILITY_MAX_DAYS", "366"))  # Longest date range per query
+    INVENTORY_LOCK_STRIPES: int = int(os.getenv("INVENTORY_LOCK_STRIPES", "1024"))  # Locks shared by all accommodations and packages
+    
+    # Idempotency-Key settings for POST /api/bookings
+    IDEMPOTENCY_TTL: float = float(os.getenv("IDEMPOTENCY_TTL", "86400"))  # Seconds a key replays its booking
+    IDEMPOTENCY_MAXSIZE: int = int(os.getenv("IDEMPOTENCY_MAXSIZE", "10000"))
+    BULK_BOOKING_MAX: int = int(os.getenv("BULK_BOOKING_MAX", "100"))  # Bookings per POST /api/bookings/bulk
+    
+    # Pricing settings
+    QUOTE_MAX_COMBINATIONS: int = int(os.getenv("QUOTE_MAX_COMBINATIONS", "100000"))  # Prices per batch quote request
+    
+    # Metrics settings (Prometheus text format on /metrics)
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    
+    # Request profiling (folded stacks served by /api/admin/profiles)
+    PROFILING_ENABLED: bool = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SAMPLE_RATE: float = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))  # Fraction of requests profiled without the X-Profile header
+    PROFILING_INTERVAL: float = float(os.getenv("PROFILING_INTERVAL", "0.001"))  # Seconds between stack samples
+    PROFILING_MAX_STORED: int = int(os.getenv("PROFILING_MAX_STORED", "50"))  # Profiles kept in memory
+    PROFILING_DIR: str = os.getenv("PROFILING_DIR", "")  # Also write <id>.folded files here
+    
+    # Admin settings (admin endpoints are disabled while ADMIN_API_KEY is empty)
+    ADMIN_API_KEY: str = os.getenv("ADMIN_API_KEY", "")
+    
     # OpenAI settings
     OPENAI_API_KEY: str = os.getenv("OPENAI_API_KEY", "")
+    OPENAI_API_BASE: str = os.getenv("OPENAI_API_BASE", "https://api.openai.com/v1")
+    
+    # AI response cache settings
+    AI_CACHE_TTL: float = float(os.getenv("AI_CACHE_TTL", "86400"))  # Seconds
+    AI_CACHE_MAXSIZE: int = int(os.getenv("AI_CACHE_MAXSIZE", "1000"))
+    AI_CACHE_PATH: str = os.getenv("AI_CACHE_PATH", "")  # JSON file to persist the cache across restarts
+    AI_MAX_CONCURRENCY: int = int(os.getenv("AI_MAX_CONCURRENCY", "16"))  # Concurrent OpenAI calls
+    AI_MAX_QUEUE: int = int(os.getenv("AI_MAX_QUEUE", "64"))  # Calls waiting for a slot before shedding with 429
+    AI_TIMEOUT: float = float(os.getenv("AI_TIMEOUT", "30"))  # Seconds per OpenAI call
+    AI_BREAKER_FAILURE_RATE: float = float(os.getenv("AI_BREAKER_FAILURE_RATE", "0.5"))
+    AI_BREAKER_MIN_CALLS: int = int(os.getenv("AI_BREAKER_MIN_CALLS", "10"))
+    AI_BREAKER_WINDOW: int = int(os.getenv("AI_BREAKER_WINDOW", "20"))  # Recent calls considered
+    AI_BREAKER_COOLDOWN: float = float(os.getenv("AI_BREAKER_COOLDOWN", "30"))  # Seconds to fail fast once open
+    AI_JOB_WORKERS: int = int(os.getenv("AI_JOB_WORKERS", "4"))  # Concurrent trip planner jobs
+    AI_JOB_QUEUE_SIZE: int = int(os.getenv("AI_JOB_QUEUE_SIZE", "100"))  # Queued jobs before submissions are refused
+    AI_JOB_RESULT_TTL: float = float(os.getenv("AI_JOB_RESULT_TTL", "3600"))  # Seconds finished jobs are kept
+    AI_PROMPT_COST_PER_1K: float = float(os.getenv("AI_PROMPT_COST_PER_1K", "0.0025"))  # USD per 1K prompt tokens
+    AI_COMPLETION_COST_PER_1K: float = float(os.getenv("AI_COMPLETION_COST_PER_1K", "0.01"))  # USD per 1K completion tokens
     
     # CORS settings
     CORS_ORIGINS: list = ["*"]
     CORS_HEADERS: list = ["*"]
     CORS_METHODS: list = ["*"]
+    CORS_EXPOSE_HEADERS: list = ["X-Next-Cursor", "Idempotent-Replayed"]
     
     class Config:
         env_file = ".env"
@@ -1,8 +1,57 @@
-from supabase import create_client
+import asyncio
+import time
+from collections import Counter
+import httpx
+from postgrest import AsyncPostgrestClient
+from postgrest.constants import DEFAULT_POSTGREST_CLIENT_HEADERS
+
 from .config import settings
+from .cache import catalog_cache, search_cache, user_cache, cached
+from .metrics import observe_call, current_route
+from .query_log import query_log
+from .storage.memory import MemoryTransport
+from .storage.sqlite import SQLiteTransport
+
+def create_storage_transport(backend: str = None):
+    """httpx transport for a local storage backend, or None to call Supabase over the network"""
+    backend = backend or settings.DATABASE_BACKEND
+    if backend == "postgrest":
+        return None
+    if backend == "memory":
+        return MemoryTransport.from_schema(latency=settings.DATABASE_LATENCY)
+    if backend == "sqlite":
+        return SQLiteTransport(settings.DATABASE_SQLITE_PATH, latency=settings.DATABASE_LATENCY)
+    raise ValueError(f"Unknown DATABASE_BACKEND: {backend}")
+
+class PooledPostgrestClient(AsyncPostgrestClient):
+    """Async PostgREST client sharing one keep-alive connection pool"""
+
+    def create_session(self, base_url, headers, timeout):
+        return httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            timeout=timeout,
+            limits=httpx.Limits(
+                max_connections=settings.DB_POOL_SIZE,
+                max_keepalive_connections=settings.DB_POOL_KEEPALIVE,
+            ),
+            transport=create_storage_transport(),
+        )
 
-# Initialize Supabase client
-supabase = create_client(settings.SUPABASE_URL, settings.SUPABASE_KEY)
+# Initialize Supabase REST client (local backends ignore the URL)
+supabase = PooledPostgrestClient(
+    f"{settings.SUPABASE_URL if settings.DATABASE_BACKEND == 'postgrest' else 'http://storage.local'}/rest/v1",
+    headers={
+        **DEFAULT_POSTGREST_CLIENT_HEADERS,
+        "apiKey": settings.SUPABASE_KEY,
+        "Authorization": f"Bearer {settings.SUPABASE_KEY}",
+    },
+    timeout=httpx.Timeout(
+        settings.DB_QUERY_TIMEOUT,
+        connect=settings.DB_CONNECT_TIMEOUT,
+        pool=settings.DB_POOL_TIMEOUT,
+    ),
+)
 
 # Define database tables for reference
 USERS_TABLE = "users"
@@ -11,63 +60,227 @@ DESTINATIONS_TABLE = "destinations"
 ACCOMMODATIONS_TABLE = "accommodations"
 PACKAGES_TABLE = "packages"
 
+async def _execute(query):
+    """Run a PostgREST query without blocking the event loop, bounded by DB_QUERY_TIMEOUT"""
+    started = time.perf_counter()
+    response = None
+    try:
+        with observe_call("db"):
+            response = await asyncio.wait_for(query.execute(), timeout=settings.DB_QUERY_TIMEOUT)
+        return response
+    finally:
+        query_log.record(query, time.perf_counter() - started, response, current_route())
+
+async def close_database():
+    """Close pooled connections to the database"""
+    await supabase.aclose()
+
+def invalidate_catalog(table: str = None):
+    """Drop cached catalog reads for one table, or for the whole catalog"""
+    if table:
+        catalog_cache.invalidate_prefix(table)
+        search_cache.invalidate_prefix(table)
+    else:
+        catalog_cache.clear()
+        search_cache.clear()
+
+def _add_param(query, key: str, value: str):
+    """Attach a raw PostgREST parameter (e.g. or=, multi-column order=) to a query"""
+    query.params = query.params.add(key, value)
+    return query
+
+def _quote(value) -> str:
+    """Double-quote a value for a PostgREST logic filter, so , . ( ) in it are taken literally"""
+    return '"' + str(value).replace("\\", "\\\\").replace('"', '\\"') + '"'
+
+def _keyset_page(query, column: str, descending: bool, after: tuple = None):
+    """Order by the sort column (nulls last) then id, resuming after `after`.
+
+    `after` is the sort value and id of the last row already returned; rows
+    with no sort value come last, so a None sort value means paging through them.
+    """
+    if after:
+        last_value, last_id = after
+        if last_value is None:
+            query = _add_param(query, "and", f"({column}.is.null,id.gt.{_quote(last_id)})")
+        else:
+            direction = "lt" if descending else "gt"
+            value = _quote(last_value)
+            query = _add_param(
+                query, "or",
+                f"({column}.{direction}.{value},and({column}.eq.{value},id.gt.{_quote(last_id)}),{column}.is.null)"
+            )
+    return _add_param(query, "order", f"{column}.{'desc' if descending else 'asc'}.nullslast,id.asc")
+
+# Accommodation search sort options: name -> (column, descending)
+ACCOMMODATION_SORTS = {
+    "price": ("price_per_night", False),
+    "-price": ("price_per_night", True),
+    "rating": ("rating", False),
+    "-rating": ("rating", True),
+}
+
+# User booking list sort options: name -> (column, descending)
+BOOKING_SORTS = {
+    "created_at": ("created_at", False),
+    "-created_at": ("created_at", True),
+    "departure_date": ("departure_date", False),
+    "-departure_date": ("departure_date", True),
+    "total_price": ("total_price", False),
+    "-total_price": ("total_price", True),
+}
+
 # Helper functions for common database operations
 async def get_user_by_email(email: str):
-    response = supabase.table(USERS_TABLE).select("*").eq("email", email).execute()
+    response = await _execute(supabase.table(USERS_TABLE).select("*").eq("email", email))
     return response.data[0] if response.data else None
 
+@cached(user_cache, USERS_TABLE)
 async def get_user_by_id(user_id: str):
-    response = supabase.table(USERS_TABLE).select("*").eq("id", user_id).execute()
+    response = await _execute(supabase.table(USERS_TABLE).select("*").eq("id", user_id))
     return response.data[0] if response.data else None
 
 async def create_user(user_data: dict):
-    response = supabase.table(USERS_TABLE).insert(user_data).execute()
+    response = await _execute(supabase.table(USERS_TABLE).insert(user_data))
     return response.data[0] if response.data else None
 
 async def update_user(user_id: str, user_data: dict):
-    response = supabase.table(USERS_TABLE).update(user_data).eq("id", user_id).execute()
-    return response.data[0] if response.data else None
+    response = await _execute(supabase.table(USERS_TABLE).update(user_data).eq("id", user_id))
+    updated_user = response.data[0] if response.data else None
+    
+    # Write through so the next authenticated request sees the change
+    user_cache.invalidate(get_user_by_id.cache_key(user_id))
+    if updated_user:
+        user_cache.set(get_user_by_id.cache_key(user_id), updated_user)
+    
+    return updated_user
 
-async def get_all_destinations():
-    response = supabase.table(DESTINATIONS_TABLE).select("*").execute()
+@cached(catalog_cache, DESTINATIONS_TABLE)
+async def get_all_destinations(columns: str = "*"):
+    response = await _execute(supabase.table(DESTINATIONS_TABLE).select(columns))
     return response.data
 
+@cached(catalog_cache, DESTINATIONS_TABLE)
 async def get_destination_by_id(destination_id: str):
-    response = supabase.table(DESTINATIONS_TABLE).select("*").eq("id", destination_id).execute()
+    response = await _execute(supabase.table(DESTINATIONS_TABLE).select("*").eq("id", destination_id))
     return response.data[0] if response.data else None
 
-async def get_accommodations_by_destination(destination_id: str):
-    response = supabase.table(ACCOMMODATIONS_TABLE).select("*").eq("destination_id", destination_id).execute()
+@cached(catalog_cache, ACCOMMODATIONS_TABLE)
+async def get_accommodations_by_destination(destination_id: str, columns: str = "*"):
+    response = await _execute(supabase.table(ACCOMMODATIONS_TABLE).select(columns).eq("destination_id", destination_id))
     return response.data
 
+@cached(catalog_cache, ACCOMMODATIONS_TABLE)
+async def get_accommodation_counts_by_destination():
+    # Only the foreign key column is fetched; counting happens here in one pass
+    response = await _execute(supabase.table(ACCOMMODATIONS_TABLE).select("destination_id"))
+    return dict(Counter(row["destination_id"] for row in response.data))
+
+@cached(search_cache, ACCOMMODATIONS_TABLE)
+async def search_accommodations(
+    destination_id: str = None,
+    type: str = None,
+    min_price: float = None,
+    max_price: float = None,
+    min_rating: float = None,
+    sort: str = "price",
+    limit: int = 50,
+    after: tuple = None,
+    columns: str = "*",
+):
+    """Filter, sort and page accommodations in the database.
+
+    Rows are ordered by the sort column then id, so `after` (the sort value and
+    id of the last row already returned) resumes the listing without offsets.
+    Results are cached apart from the catalog, so paging cannot evict by-id lookups.
+    """
+    column, descending = ACCOMMODATION_SORTS[sort]
+    query = supabase.table(ACCOMMODATIONS_TABLE).select(columns)
+    
+    if destination_id:
+        query = query.eq("destination_id", destination_id)
+    if type:
+        query = query.eq("type", type)
+    if min_price is not None:
+        query = query.gte("price_per_night", min_price)
+    if max_price is not None:
+        query = query.lte("price_per_night", max_price)
+    if min_rating is not None:
+        query = query.gte("rating", min_rating)
+    
+    query = _keyset_page(query, column, descending, after)
+    response = await _execute(query.limit(limit))
+    return response.data
+
+@cached(catalog_cache, ACCOMMODATIONS_TABLE)
 async def get_accommodation_by_id(accommodation_id: str):
-    response = supabase.table(ACCOMMODATIONS_TABLE).select("*").eq("id", accommodation_id).execute()
+    response = await _execute(supabase.table(ACCOMMODATIONS_TABLE).select("*").eq("id", accommodation_id))
     return response.data[0] if response.data else None
 
-async def get_all_packages():
-    response = supabase.table(PACKAGES_TABLE).select("*").execute()
+@cached(catalog_cache, PACKAGES_TABLE)
+async def get_all_packages(columns: str = "*"):
+    response = await _execute(supabase.table(PACKAGES_TABLE).select(columns))
     return response.data
 
+@cached(catalog_cache, PACKAGES_TABLE)
 async def get_package_by_id(package_id: str):
-    response = supabase.table(PACKAGES_TABLE).select("*").eq("id", package_id).execute()
+    response = await _execute(supabase.table(PACKAGES_TABLE).select("*").eq("id", package_id))
     return response.data[0] if response.data else None
 
+async def get_rows_by_ids(table: str, ids: list):
+    response = await _execute(supabase.table(table).select("*").in_("id", ids))
+    return response.data
+
 async def create_booking(booking_data: dict):
-    response = supabase.table(BOOKINGS_TABLE).insert(booking_data).execute()
+    response = await _execute(supabase.table(BOOKINGS_TABLE).insert(booking_data))
     return response.data[0] if response.data else None
 
-async def get_bookings_by_user_id(user_id: str):
-    response = supabase.table(BOOKINGS_TABLE).select("*").eq("user_id", user_id).execute()
+async def create_booking_rows(rows: list):
+    response = await _execute(supabase.table(BOOKINGS_TABLE).insert(rows))
+    return response.data
+
+async def get_bookings_by_user_id(
+    user_id: str,
+    status: str = None,
+    sort: str = "-created_at",
+    limit: int = 50,
+    after: tuple = None,
+    columns: str = "*",
+):
+    """Filter, sort and page a user's bookings in the database.
+
+    Paging works like search_accommodations: rows are ordered by the sort column
+    then id, and `after` is the sort value and id of the last row returned.
+    """
+    column, descending = BOOKING_SORTS[sort]
+    query = supabase.table(BOOKINGS_TABLE).select(columns).eq("user_id", user_id)
+    
+    if status:
+        query = query.eq("status", status)
+    
+    query = _keyset_page(query, column, descending, after)
+    response = await _execute(query.limit(limit))
+    return response.data
+
+async def get_active_bookings(column: str, ids: list, since: str):
+    # Only what the availability index needs, for stays that have not ended
+    response = await _execute(
+        supabase.table(BOOKINGS_TABLE)
+        .select(f"id,{column},departure_date,return_date,travelers")
+        .in_(column, ids)
+        .neq("status", "Cancelled")
+        .gt("return_date", since)
+    )
     return response.data
 
 async def get_booking_by_id(booking_id: str):
-    response = supabase.table(BOOKINGS_TABLE).select("*").eq("id", booking_id).execute()
+    response = await _execute(supabase.table(BOOKINGS_TABLE).select("*").eq("id", booking_id))
     return response.data[0] if response.data else None
 
 async def update_booking(booking_id: str, booking_data: dict):
-    response = supabase.table(BOOKINGS_TABLE).update(booking_data).eq("id", booking_id).execute()
+    response = await _execute(supabase.table(BOOKINGS_TABLE).update(booking_data).eq("id", booking_id))
     return response.data[0] if response.data else None
 
 async def delete_booking(booking_id: str):
-    response = supabase.table(BOOKINGS_TABLE).delete().eq("id", booking_id).execute()
-    return response.data[0] if response.data else None
\ No newline at end of file
+    response = await _execute(supabase.table(BOOKINGS_TABLE).delete().eq("id", booking_id))
+    return response.data[0] if response.data else None
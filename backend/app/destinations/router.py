@@ -1,28 +1,39 @@
+import asyncio
 from fastapi import APIRouter, HTTPException, status, Depends
-from typing import List
+from fastapi.responses import JSONResponse
+from typing import List, Optional
 
-from ..database import get_all_destinations, get_destination_by_id, get_accommodations_by_destination
+from ..database import get_all_destinations, get_destination_by_id, get_accommodation_counts_by_destination
 from ..auth.utils import get_current_user
+from ..projection import FIELDS_QUERY, select_columns, wants
 from .models import DestinationResponse, DestinationDetail
 
 router = APIRouter()
 
 @router.get("/", response_model=List[DestinationResponse])
-async def get_destinations():
+async def get_destinations(fields: Optional[str] = FIELDS_QUERY):
     """Get all available space destinations"""
-    destinations = await get_all_destinations()
+    columns = select_columns(DestinationResponse, fields, computed=("accommodations_count",))
+    
+    if not wants(fields, "accommodations_count"):
+        return JSONResponse(await get_all_destinations(columns))
+    
+    destinations, accommodation_counts = await asyncio.gather(
+        get_all_destinations(columns),
+        get_accommodation_counts_by_destination(),
+    )
     
     # Enhance destinations with accommodation count
     enhanced_destinations = []
     for destination in destinations:
-        accommodations = await get_accommodations_by_destination(destination["id"])
         destination_with_count = {
             **destination,
-            "accommodations_count": len(accommodations)
+            "accommodations_count": accommodation_counts.get(destination["id"], 0)
         }
         enhanced_destinations.append(destination_with_count)
     
-    return enhanced_destinations
+    # Sparse fieldsets would fail response model validation
+    return JSONResponse(enhanced_destinations) if fields else enhanced_destinations
 
 @router.get("/{destination_id}", response_model=DestinationDetail)
 async def get_destination(destination_id: str):
@@ -0,0 +1,59 @@
+import hashlib
+import json
+
+from .cache import AsyncTTLCache
+from .config import settings
+
+class IdempotencyKeyReusedError(Exception):
+    pass
+
+def request_fingerprint(body: dict) -> str:
+    return hashlib.sha256(json.dumps(body, sort_keys=True, default=str).encode()).hexdigest()
+
+class IdempotencyStore:
+    """Remembers the result of a write by client-supplied key.
+
+    Replays within the TTL return the stored result, and concurrent requests
+    with the same key share one execution. Only successful results are stored,
+    so a request that failed can be retried with the same key. `store` needs
+    get_or_load() and stats() like AsyncTTLCache; a table-backed store with
+    the same methods makes keys survive restarts and span workers.
+    """
+
+    def __init__(self, store):
+        self.store = store
+        self.replays = 0
+        self.executions = 0
+
+    async def run(self, key, fingerprint: str, operation) -> tuple:
+        """Return (result, replayed), running operation() only for a new key.
+
+        Raises IdempotencyKeyReusedError when the key was used for a
+        different request body.
+        """
+        executed = []
+
+        async def execute():
+            executed.append(True)
+            self.executions += 1
+            result = await operation()
+            return None if result is None else (fingerprint, result)
+
+        entry = await self.store.get_or_load(key, execute)
+        if entry is None:
+            return None, False
+
+        stored_fingerprint, result = entry
+        if stored_fingerprint != fingerprint:
+            raise IdempotencyKeyReusedError()
+        if not executed:
+            self.replays += 1
+        return result, not executed
+
+    def stats(self):
+        return {"executions": self.executions, "replays": self.replays, **self.store.stats()}
+
+booking_idempotency = IdempotencyStore(AsyncTTLCache(
+    maxsize=settings.IDEMPOTENCY_MAXSIZE,
+    ttl=settings.IDEMPOTENCY_TTL,
+))
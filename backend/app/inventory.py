@@ -0,0 +1,159 @@
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from .availability import availability_index, package_seats
+from .config import settings
+
+class CapacityError(Exception):
+    def __init__(self, detail: str, failures: dict = None):
+        super().__init__(detail)
+        self.failures = failures or {}  # Group index -> detail, for book_many()
+
+class StripedLock:
+    """A fixed set of locks shared by any number of keys.
+
+    A key always maps to the same stripe, so bookings for the same
+    accommodation or package are serialised while unrelated ones (almost
+    always) land on different stripes and proceed concurrently.
+    """
+
+    def __init__(self, stripes: int):
+        self.stripes = stripes
+        self._locks = None
+        self.acquisitions = 0
+        self.contended = 0
+        self.wait_time = 0.0
+
+    @asynccontextmanager
+    async def hold(self, keys):
+        if self._locks is None:
+            # Created lazily so they bind to the server's event loop
+            self._locks = [asyncio.Lock() for _ in range(self.stripes)]
+
+        # Always acquire in stripe order so two holders can never deadlock
+        stripes = sorted({hash(key) % self.stripes for key in keys})
+        acquired = []
+        try:
+            for stripe in stripes:
+                lock = self._locks[stripe]
+                self.acquisitions += 1
+                if lock.locked():
+                    self.contended += 1
+                    started = time.perf_counter()
+                    await lock.acquire()
+                    self.wait_time += time.perf_counter() - started
+                else:
+                    await lock.acquire()
+                acquired.append(lock)
+            yield
+        finally:
+            for lock in reversed(acquired):
+                lock.release()
+
+    def stats(self):
+        return {
+            "stripes": self.stripes,
+            "acquisitions": self.acquisitions,
+            "contended": self.contended,
+            "total_wait_seconds": round(self.wait_time, 3),
+        }
+
+class Inventory:
+    """Capacity-checked booking writes.
+
+    Accommodation capacity is counted in travelers per night and package
+    capacity in travelers per departure day. The capacity check and an
+    in-memory reservation of the places happen under the stripes of the
+    accommodation and package, so concurrent bookings cannot both take the last
+    places. The database write happens after the locks are released, with the
+    reservation holding the places until the written row replaces it.
+    """
+
+    def __init__(self, stripes: int):
+        self.locks = StripedLock(stripes)
+        self.reserved = 0
+        self.rejected = 0
+
+    async def book(self, booking: dict, accommodation: dict, package: dict, write, previous: dict = None):
+        """Check the booking fits, then run write() and record the row it returns.
+
+        previous is the stored row when an existing booking is being changed;
+        its own places are not counted against it.
+        """
+        keys = [("accommodations", accommodation["id"]), ("packages", package["id"])]
+        async with self.locks.hold(keys):
+            if not await availability_index.fits(accommodation, booking):
+                self.rejected += 1
+                raise CapacityError("Accommodation is fully booked for the selected dates")
+            if not await package_seats.fits(package, booking):
+                self.rejected += 1
+                raise CapacityError("Package is sold out for the selected departure date")
+            reservations = availability_index.reserve(booking), package_seats.reserve(booking)
+
+        try:
+            row = await write()
+        finally:
+            availability_index.release(reservations[0])
+            package_seats.release(reservations[1])
+
+        if row:
+            self.reserved += 1
+            self.record(previous, row)
+        return row
+
+    async def book_many(self, items: list, write):
+        """Book (booking, accommodation, package) items together, or none of them.
+
+        Capacity is checked with the group's own earlier items counted, then
+        write() inserts every row and returns them in order.
+        """
+        accommodations = list({a["id"]: a for _, a, _ in items}.values())
+        packages = list({p["id"]: p for _, _, p in items}.values())
+        keys = [("accommodations", a["id"]) for a in accommodations] + [("packages", p["id"]) for p in packages]
+
+        reservations = []
+        try:
+            async with self.locks.hold(keys):
+                # One query per index for every calendar the group touches
+                await availability_index.calendars(accommodations)
+                await package_seats.calendars(packages)
+
+                failures = {}
+                for index, (booking, accommodation, package) in enumerate(items):
+                    if not await availability_index.fits(accommodation, booking):
+                        failures[index] = "Accommodation is fully booked for the selected dates"
+                    elif not await package_seats.fits(package, booking):
+                        failures[index] = "Package is sold out for the selected departure date"
+                    else:
+                        reservations.append((availability_index.reserve(booking), package_seats.reserve(booking)))
+                if failures:
+                    self.rejected += 1
+                    raise CapacityError("Not enough capacity for the group", failures)
+
+            rows = await write()
+        finally:
+            for accommodation_reservation, package_reservation in reservations:
+                availability_index.release(accommodation_reservation)
+                package_seats.release(package_reservation)
+
+        for row in rows:
+            self.reserved += 1
+            self.record(None, row)
+        return rows
+
+    def record(self, previous: dict = None, row: dict = None):
+        """Apply a booking change that needs no capacity check, such as a cancellation"""
+        availability_index.apply(previous, row)
+        package_seats.apply(previous, row)
+
+    def stats(self):
+        return {
+            "reserved": self.reserved,
+            "rejected": self.rejected,
+            "locks": self.locks.stats(),
+            "accommodations": availability_index.stats(),
+            "packages": package_seats.stats(),
+        }
+
+inventory = Inventory(stripes=settings.INVENTORY_LOCK_STRIPES)
@@ -0,0 +1,86 @@
+import asyncio
+
+from .cache import catalog_cache
+from .database import (
+    get_rows_by_ids, get_destination_by_id, get_accommodation_by_id, get_package_by_id,
+    DESTINATIONS_TABLE, ACCOMMODATIONS_TABLE, PACKAGES_TABLE
+)
+
+class DataLoader:
+    """Coalesces lookups by key into batches and memoizes them.
+
+    Every load() issued in the same event-loop tick is resolved by a single
+    call to batch_load(keys), which returns a dict of key -> value (missing
+    keys resolve to None). Results are kept for the lifetime of the loader,
+    so one loader should be created per request.
+    """
+
+    def __init__(self, batch_load):
+        self.batch_load = batch_load
+        self._futures = {}
+        self._queue = []
+
+    def load(self, key):
+        future = self._futures.get(key)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = loop.create_future()
+            self._futures[key] = future
+            self._queue.append(key)
+            if len(self._queue) == 1:
+                loop.call_soon(lambda: asyncio.ensure_future(self._dispatch()))
+        return future
+
+    async def load_many(self, keys):
+        return await asyncio.gather(*(self.load(key) for key in keys))
+
+    async def _dispatch(self):
+        keys, self._queue = self._queue, []
+        try:
+            results = await self.batch_load(keys)
+        except Exception as e:
+            for key in keys:
+                future = self._futures.pop(key)
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for key in keys:
+            future = self._futures[key]
+            if not future.done():
+                future.set_result(results.get(key))
+
+def catalog_batch_load(table: str, lookup):
+    """Batch loader for a catalog table that reads through the catalog cache.
+
+    lookup is the cached single-row helper (e.g. get_destination_by_id) whose
+    cache entries are shared with the batch.
+    """
+    async def batch_load(ids):
+        rows = {}
+        missing = []
+        for row_id in ids:
+            row = catalog_cache.lookup(lookup.cache_key(row_id))
+            if row is None:
+                missing.append(row_id)
+            else:
+                rows[row_id] = row
+
+        if missing:
+            for row in await get_rows_by_ids(table, missing):
+                rows[row["id"]] = row
+                catalog_cache.set(lookup.cache_key(row["id"]), row)
+
+        return rows
+    return batch_load
+
+class Loaders:
+    """Per-request set of loaders for the catalog tables"""
+
+    def __init__(self):
+        self.destinations = DataLoader(catalog_batch_load(DESTINATIONS_TABLE, get_destination_by_id))
+        self.accommodations = DataLoader(catalog_batch_load(ACCOMMODATIONS_TABLE, get_accommodation_by_id))
+        self.packages = DataLoader(catalog_batch_load(PACKAGES_TABLE, get_package_by_id))
+
+def get_loaders() -> Loaders:
+    """FastAPI dependency; dependencies are cached per request, so each request gets one Loaders"""
+    return Loaders()
@@ -1,13 +1,21 @@
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse
 
 from .config import settings
+from .database import close_database
+from .metrics import MetricsMiddleware, registry
+from .profiling import ProfilingMiddleware
+from .ai.utils import load_response_cache, save_response_cache
+from .ai.jobs import trip_plan_jobs
+from .ai.upstream import UpstreamError, UpstreamUnavailableError, UpstreamBusyError
 from .auth.router import router as auth_router
 from .bookings.router import router as bookings_router
 from .destinations.router import router as destinations_router
 from .accommodations.router import router as accommodations_router
 from .packages.router import router as packages_router
 from .ai.router import router as ai_router
+from .admin.router import router as admin_router
 
 # Initialize FastAPI app
 app = FastAPI(
@@ -23,8 +31,18 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=settings.CORS_METHODS,
     allow_headers=settings.CORS_HEADERS,
+    expose_headers=settings.CORS_EXPOSE_HEADERS,
 )
 
+# Opt-in request profiling; not installed at all unless enabled
+if settings.PROFILING_ENABLED:
+    app.add_middleware(ProfilingMiddleware)
+
+# Record per-route latency and upstream calls (added last so it is outermost and
+# counts CORS preflights and profiled requests too)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 # Include routers
 app.include_router(auth_router, prefix="/api/auth", tags=["Authentication"])
 app.include_router(destinations_router, prefix="/api/destinations", tags=["Destinations"])
@@ -32,12 +50,46 @@ app.include_router(accommodations_router, prefix="/api/accommodations", tags=["A
 app.include_router(packages_router, prefix="/api/packages", tags=["Packages"])
 app.include_router(bookings_router, prefix="/api/bookings", tags=["Bookings"])
 app.include_router(ai_router, prefix="/api/ai", tags=["AI Assistant"])
+app.include_router(admin_router, prefix="/api/admin", tags=["Admin"])
+
+@app.exception_handler(UpstreamError)
+async def upstream_error_handler(request: Request, exc: UpstreamError):
+    """Report AI upstream failures instead of returning them as answers"""
+    if isinstance(exc, UpstreamUnavailableError):
+        status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+        headers = {"Retry-After": str(max(1, round(exc.retry_after)))}
+    elif isinstance(exc, UpstreamBusyError):
+        status_code = status.HTTP_429_TOO_MANY_REQUESTS
+        headers = {"Retry-After": "1"}
+    else:
+        status_code = status.HTTP_502_BAD_GATEWAY
+        headers = None
+    return JSONResponse(status_code=status_code, content={"detail": str(exc)}, headers=headers)
+
+@app.on_event("startup")
+async def startup():
+    """Restore persisted AI responses and start background AI workers"""
+    load_response_cache()
+    await trip_plan_jobs.start()
+
+@app.on_event("shutdown")
+async def shutdown():
+    """Stop background AI workers, release pooled database connections and persist AI responses"""
+    await trip_plan_jobs.stop()
+    await close_database()
+    save_response_cache()
 
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
     return {"status": "healthy", "version": settings.APP_VERSION}
 
+if settings.METRICS_ENABLED:
+    @app.get("/metrics", include_in_schema=False)
+    async def metrics():
+        """Prometheus metrics"""
+        return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
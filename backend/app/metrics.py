@@ -0,0 +1,220 @@
+import sys
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from .profiling import current_profile, folded_stack
+
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(names: tuple, values: tuple, extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+def _number(value) -> str:
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = defaultdict(int)
+        if not labels:
+            self._values[()] = 0
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] += amount
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        for labels, value in self._values.items():
+            lines.append(f"{self.name}{_labels(self.labels, labels)} {_number(value)}")
+        return lines
+
+class Gauge(Counter):
+    def dec(self, *labels, amount: float = 1):
+        self._values[labels] -= amount
+
+    def render(self) -> list:
+        lines = super().render()
+        lines[1] = f"# TYPE {self.name} gauge"
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets: tuple, labels: tuple = ()):
+        self.name = name
+        self.help = help
+        self.buckets = buckets
+        self.labels = labels
+        self._series = {}  # labels -> [bucket counts, sum, count]
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+        series[2] += 1
+
+    def render(self) -> list:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        for labels, (counts, total, count) in self._series.items():
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                le = f'le="{bound}"'
+                lines.append(f"{self.name}_bucket{_labels(self.labels, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.labels, labels)} {_number(total)}")
+            lines.append(f"{self.name}_count{_labels(self.labels, labels)} {count}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        return "\n".join(line for metric in self.metrics for line in metric.render()) + "\n"
+
+registry = Registry()
+ROUTE = ("method", "route")
+
+requests_total = registry.add(Counter("http_requests_total", "HTTP requests by route and status", ROUTE + ("status",)))
+requests_in_flight = registry.add(Gauge("http_requests_in_flight", "HTTP requests being served"))
+request_duration = registry.add(Histogram(
+    "http_request_duration_seconds", "Time to serve a request, including streamed bodies", LATENCY_BUCKETS, ROUTE
+))
+response_size = registry.add(Histogram("http_response_size_bytes", "Response body size", SIZE_BUCKETS, ROUTE))
+request_db_calls = registry.add(Histogram(
+    "http_request_db_calls", "Database calls made while serving a request", COUNT_BUCKETS, ROUTE
+))
+request_db_duration = registry.add(Histogram(
+    "http_request_db_seconds", "Time a request spent in database calls", LATENCY_BUCKETS, ROUTE
+))
+request_openai_calls = registry.add(Histogram(
+    "http_request_openai_calls", "OpenAI calls made while serving a request", COUNT_BUCKETS, ROUTE
+))
+request_openai_duration = registry.add(Histogram(
+    "http_request_openai_seconds", "Time a request spent in OpenAI calls", LATENCY_BUCKETS, ROUTE
+))
+call_duration = registry.add(Histogram(
+    "upstream_call_duration_seconds", "Database and OpenAI call latency", LATENCY_BUCKETS, ("upstream", "outcome")
+))
+
+class RequestMetrics:
+    """Upstream calls made on behalf of one request"""
+
+    __slots__ = ("scope", "resolve_route", "db_calls", "db_seconds", "openai_calls", "openai_seconds")
+
+    def __init__(self, scope: dict, resolve_route):
+        self.scope = scope
+        self.resolve_route = resolve_route
+        self.db_calls = 0
+        self.db_seconds = 0.0
+        self.openai_calls = 0
+        self.openai_seconds = 0.0
+
+    def route(self) -> str:
+        return f"{self.scope['method']} {self.resolve_route(self.scope)}"
+
+# Set by MetricsMiddleware; tasks started while serving a request inherit it
+current_request = ContextVar("current_request_metrics", default=None)
+
+def current_route():
+    """'METHOD /route/{template}' of the request being served, if any"""
+    request = current_request.get()
+    return request.route() if request is not None else None
+
+@contextmanager
+def observe_call(upstream: str):
+    """Time a database ("db") or OpenAI ("openai") call and charge it to the current request"""
+    profile = current_profile.get()
+    stack = folded_stack(sys._getframe(2)) if profile is not None else None
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        elapsed = time.perf_counter() - started
+        call_duration.observe(elapsed, upstream, outcome)
+        request = current_request.get()
+        if request is not None:
+            if upstream == "db":
+                request.db_calls += 1
+                request.db_seconds += elapsed
+            else:
+                request.openai_calls += 1
+                request.openai_seconds += elapsed
+        if profile is not None:
+            profile.add_await(stack, upstream, elapsed)
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency, response size and upstream calls per route.
+
+    Routes are labelled with their path template, so /api/bookings/{booking_id}
+    is one series however many bookings exist; unmatched paths share one label.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._paths = {}  # endpoint -> path template
+
+    def route(self, scope) -> str:
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return "unmatched"
+        path = self._paths.get(endpoint)
+        if path is None:
+            path = next((r.path for r in scope["app"].routes if getattr(r, "endpoint", None) is endpoint), "unmatched")
+            self._paths[endpoint] = path
+        return path
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request = RequestMetrics(scope, self.route)
+        token = current_request.set(request)
+        status_code = 500
+        size = 0
+
+        async def send_and_measure(message):
+            nonlocal status_code, size
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_and_measure)
+        finally:
+            elapsed = time.perf_counter() - started
+            requests_in_flight.dec()
+            current_request.reset(token)
+
+            labels = (scope["method"], self.route(scope))
+            requests_total.inc(*labels, status_code)
+            request_duration.observe(elapsed, *labels)
+            response_size.observe(size, *labels)
+            request_db_calls.observe(request.db_calls, *labels)
+            request_db_duration.observe(request.db_seconds, *labels)
+            request_openai_calls.observe(request.openai_calls, *labels)
+            request_openai_duration.observe(request.openai_seconds, *labels)
@@ -33,4 +33,21 @@ class PackageDetail(BaseModel):
     amenity_kits: Optional[Dict[str, Any]] = None
     baggage_allowance: Optional[Dict[str, Any]] = None
     special_services: Optional[List[str]] = None
-    transfer_options: Optional[List[Dict[str, Any]]] = None
\ No newline at end of file
+    transfer_options: Optional[List[Dict[str, Any]]] = None
+    
+class FeatureRow(BaseModel):
+    feature: str
+    included: List[bool]  # One entry per compared package, in request order
+    
+class PackageComparison(BaseModel):
+    packages: List[PackageDetail]
+    feature_matrix: List[FeatureRow]
+    common_features: List[str]
+    differences: Dict[str, List[Any]]  # Field -> value per package, only for fields that differ
+    
+class QuoteRequest(BaseModel):
+    package_ids: List[str]
+    accommodation_ids: List[str] = []  # Quoted in addition to every accommodation at destination_ids
+    destination_ids: List[str] = []
+    durations: List[int]  # Nights
+    travelers: List[int] = [1]
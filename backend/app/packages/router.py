@@ -1,42 +1,58 @@
-from fastapi import APIRouter, HTTPException, status, Query
+import asyncio
+from fastapi import APIRouter, HTTPException, status, Query, Depends
+from fastapi.responses import JSONResponse
 from typing import List, Optional
 
-from ..database import get_all_packages, get_package_by_id
-from .models import PackageResponse, PackageDetail
+from ..config import settings
+from ..database import get_all_packages, get_package_by_id, get_accommodations_by_destination
+from ..loaders import Loaders, get_loaders
+from ..pricing import quote, quote_matrix
+from ..projection import FIELDS_QUERY, select_columns
+from .models import PackageResponse, PackageDetail, PackageComparison, QuoteRequest
 
 router = APIRouter()
 
+# Fields compared value by value; features are compared by membership
+COMPARED_FIELDS = ("class_type", "price", "capacity", "meal_options", "entertainment", "special_services")
+
+def feature_matrix(packages: list) -> dict:
+    """Diff packages into a feature x package matrix and the fields whose values differ"""
+    features = list(dict.fromkeys(f for p in packages for f in p.get("features") or []))
+    included = [set(p.get("features") or []) for p in packages]
+    
+    matrix = [{"feature": f, "included": [f in i for i in included]} for f in features]
+    differences = {}
+    for field in COMPARED_FIELDS:
+        values = [p.get(field) for p in packages]
+        if any(v != values[0] for v in values[1:]):
+            differences[field] = values
+    
+    return {
+        "feature_matrix": matrix,
+        "common_features": [row["feature"] for row in matrix if all(row["included"])],
+        "differences": differences
+    }
+
 @router.get("/", response_model=List[PackageResponse])
 async def get_packages(
-    class_type: Optional[str] = Query(None, description="Filter by class type")
+    class_type: Optional[str] = Query(None, description="Filter by class type"),
+    fields: Optional[str] = FIELDS_QUERY
 ):
     """Get all available travel packages with optional filtering"""
-    packages = await get_all_packages()
+    packages = await get_all_packages(select_columns(PackageResponse, fields, required=("id", "class_type")))
     
     # Apply filters if provided
     if class_type:
         packages = [p for p in packages if p["class_type"] == class_type]
     
-    return packages
+    # Sparse fieldsets would fail response model validation
+    return JSONResponse(packages) if fields else packages
 
-@router.get("/{package_id}", response_model=PackageDetail)
-async def get_package(package_id: str):
-    """Get detailed information about a specific package"""
-    package = await get_package_by_id(package_id)
-    
-    if not package:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Package not found"
-        )
-    
-    return package
-
-@router.get("/compare", response_model=List[PackageDetail])
-async def compare_packages(package_ids: str):
+@router.get("/compare", response_model=PackageComparison)
+async def compare_packages(package_ids: str, loaders: Loaders = Depends(get_loaders)):
     """Compare multiple packages side by side"""
     # Split the comma-separated package IDs
-    ids = package_ids.split(",")
+    ids = list(dict.fromkeys(i.strip() for i in package_ids.split(",") if i.strip()))
     
     if len(ids) < 2:
         raise HTTPException(
@@ -44,27 +60,31 @@ async def compare_packages(package_ids: str):
             detail="Please provide at least two package IDs to compare"
         )
     
-    # Get details for each package
-    packages = []
-    for package_id in ids:
-        package = await get_package_by_id(package_id)
+    # Get details for all packages in one batched lookup
+    packages = await loaders.packages.load_many(ids)
+    for package_id, package in zip(ids, packages):
         if not package:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail=f"Package with ID {package_id} not found"
             )
-        packages.append(package)
     
-    return packages
+    return {"packages": packages, **feature_matrix(packages)}
 
 @router.get("/calculate-price")
 async def calculate_package_price(
     package_id: str,
     destination_id: str,
-    duration: int = Query(..., description="Duration in days")
+    duration: int = Query(..., ge=1, description="Duration in days"),
+    accommodation_id: Optional[str] = Query(None, description="Include the stay at this accommodation"),
+    travelers: int = Query(1, ge=1),
+    loaders: Loaders = Depends(get_loaders)
 ):
     """Calculate package price for a specific destination and duration"""
-    package = await get_package_by_id(package_id)
+    package, destination = await asyncio.gather(
+        loaders.packages.load(package_id),
+        loaders.destinations.load(destination_id),
+    )
     
     if not package:
         raise HTTPException(
@@ -72,29 +92,124 @@ async def calculate_package_price(
             detail="Package not found"
         )
     
-    # In a real app, you would have a pricing algorithm
-    # For now, we'll use a simple calculation
-    base_price = package["price"]
-    
-    # Apply destination factor (would typically come from destination data)
-    destination_factor = 1.5  # Example factor
+    if not destination:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Destination not found"
+        )
     
-    # Apply duration factor
-    duration_factor = 1.0
-    if duration > 7:
-        duration_factor = 0.9  # 10% discount for longer stays
-    elif duration > 14:
-        duration_factor = 0.85  # 15% discount for even longer stays
+    # Without an accommodation only the package and per-traveler fees are priced
+    accommodation = {"destination_id": destination_id, "price_per_night": 0}
+    if accommodation_id:
+        accommodation = await loaders.accommodations.load(accommodation_id)
+        if not accommodation or accommodation["destination_id"] != destination_id:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Accommodation not found at this destination"
+            )
     
-    # Calculate final price
-    final_price = base_price * destination_factor * duration_factor * duration
+    price = quote(package, accommodation, destination, duration, travelers)
     
     return {
         "package_id": package_id,
         "destination_id": destination_id,
+        "accommodation_id": accommodation_id,
         "duration": duration,
-        "base_price": base_price,
-        "destination_factor": destination_factor,
-        "duration_factor": duration_factor,
-        "final_price": final_price
-    }
\ No newline at end of file
+        "travelers": travelers,
+        "base_price": package["price"],
+        "destination_factor": price["destination_factor"],
+        "duration_factor": price["duration_factor"],
+        "costs": price["costs"],
+        "final_price": price["total"]
+    }
+
+@router.post("/quotes")
+async def quote_packages(quote_request: QuoteRequest, loaders: Loaders = Depends(get_loaders)):
+    """Price every combination of packages, accommodations, durations and traveler counts at once.
+    
+    Amounts in base_package and accommodation are per traveler; totals is indexed
+    [package][accommodation][duration][travelers].
+    """
+    package_ids = list(dict.fromkeys(quote_request.package_ids))
+    
+    if not package_ids or not (quote_request.accommodation_ids or quote_request.destination_ids):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Please provide package IDs and accommodation or destination IDs to quote"
+        )
+    
+    if not quote_request.durations or not quote_request.travelers or min(quote_request.durations + quote_request.travelers) < 1:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Durations and travelers must be positive"
+        )
+    
+    packages, requested_accommodations, destination_accommodations, requested_destinations = await asyncio.gather(
+        loaders.packages.load_many(package_ids),
+        loaders.accommodations.load_many(quote_request.accommodation_ids),
+        asyncio.gather(*(
+            get_accommodations_by_destination(d, "id,destination_id,price_per_night") for d in quote_request.destination_ids
+        )),
+        loaders.destinations.load_many(quote_request.destination_ids),
+    )
+    
+    for package_id, package in zip(package_ids, packages):
+        if not package:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Package with ID {package_id} not found"
+            )
+    
+    for accommodation_id, accommodation in zip(quote_request.accommodation_ids, requested_accommodations):
+        if not accommodation:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Accommodation with ID {accommodation_id} not found"
+            )
+    
+    for destination_id, destination in zip(quote_request.destination_ids, requested_destinations):
+        if not destination:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail=f"Destination with ID {destination_id} not found"
+            )
+    
+    accommodations = list({
+        a["id"]: a for a in requested_accommodations + [a for rows in destination_accommodations for a in rows]
+    }.values())
+    
+    combinations = len(packages) * len(accommodations) * len(quote_request.durations) * len(quote_request.travelers)
+    if combinations > settings.QUOTE_MAX_COMBINATIONS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Too many combinations to quote ({combinations}, maximum {settings.QUOTE_MAX_COMBINATIONS})"
+        )
+    
+    destination_ids = list(dict.fromkeys(a["destination_id"] for a in accommodations))
+    destinations = dict(zip(destination_ids, await loaders.destinations.load_many(destination_ids)))
+    
+    matrix = quote_matrix(packages, accommodations, destinations, quote_request.durations, quote_request.travelers)
+    
+    return {
+        "package_ids": package_ids,
+        "accommodations": [{"id": a["id"], "destination_id": a["destination_id"]} for a in accommodations],
+        "durations": quote_request.durations,
+        "travelers": quote_request.travelers,
+        "fees_per_traveler": matrix["fees"],
+        "base_package": matrix["base_package"].tolist(),
+        "accommodation": matrix["accommodation"].tolist(),
+        "totals": matrix["total"].tolist()
+    }
+
+@router.get("/{package_id}", response_model=PackageDetail)
+async def get_package(package_id: str):
+    """Get detailed information about a specific package"""
+    package = await get_package_by_id(package_id)
+    
+    if not package:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Package not found"
+        )
+    
+    return package
@@ -0,0 +1,24 @@
+import base64
+import json
+
+from fastapi import HTTPException, status
+
+def encode_cursor(sort_value, row_id: str) -> str:
+    """Opaque keyset cursor holding the sort value and id of the last row returned"""
+    return base64.urlsafe_b64encode(json.dumps([sort_value, row_id]).encode()).decode()
+
+def _is_scalar(value, types: tuple) -> bool:
+    return isinstance(value, types) and not isinstance(value, bool)
+
+def decode_cursor(cursor: str, sort_types: tuple = (str, int, float)) -> tuple:
+    """Sort value and id from a cursor; the sort value must be None or one of `sort_types`"""
+    try:
+        sort_value, row_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        sort_value, row_id = None, None
+    if not (sort_value is None or _is_scalar(sort_value, sort_types)) or not _is_scalar(row_id, (str, int)):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+    return sort_value, row_id
@@ -0,0 +1,71 @@
+import numpy as np
+
+# Per-night discount for stays longer than N nights, longest first
+DURATION_DISCOUNTS = ((14, 0.85), (7, 0.9))
+
+# Flat fees charged per traveler
+TRAVELER_FEES = {
+    "destination_fee": 500.0,
+    "space_visa": 300.0,
+    "insurance": 200.0,
+}
+
+def duration_factors(durations) -> np.ndarray:
+    """Discount factor applied to the accommodation cost for each duration"""
+    durations = np.asarray(durations)
+    return np.select(
+        [durations > nights for nights, _ in DURATION_DISCOUNTS],
+        [factor for _, factor in DURATION_DISCOUNTS],
+        default=1.0,
+    )
+
+def quote_matrix(packages: list, accommodations: list, destinations: dict, durations: list, travelers: list) -> dict:
+    """Price every package × accommodation × duration × travelers combination in one pass.
+
+    destinations maps destination id to row; its price_factor scales the package
+    price, and accommodations whose destination is missing use a factor of 1.0.
+    Per traveler:
+
+        base_package  = package.price * destination.price_factor
+        accommodation = accommodation.price_per_night * nights * duration_factor
+        fees          = sum(TRAVELER_FEES)
+
+    "total" has shape (packages, accommodations, durations, travelers).
+    """
+    package_prices = np.array([p["price"] for p in packages], dtype=float)
+    nightly = np.array([a["price_per_night"] for a in accommodations], dtype=float)
+    price_factors = np.array(
+        [(destinations.get(a["destination_id"]) or {}).get("price_factor") or 1.0 for a in accommodations], dtype=float
+    )
+    nights = np.array(durations, dtype=float)
+    party_sizes = np.array(travelers, dtype=float)
+
+    base_package = package_prices[:, None] * price_factors[None, :]
+    accommodation = nightly[:, None] * nights[None, :] * duration_factors(nights)[None, :]
+    fees = sum(TRAVELER_FEES.values())
+
+    per_traveler = base_package[:, :, None] + accommodation[None, :, :] + fees
+    total = per_traveler[..., None] * party_sizes
+
+    return {
+        "base_package": np.round(base_package, 2),
+        "accommodation": np.round(accommodation, 2),
+        "fees": fees,
+        "total": np.round(total, 2),
+    }
+
+def quote(package: dict, accommodation: dict, destination: dict, duration: int, travelers: int) -> dict:
+    """Cost breakdown of a single booking, in the shape used by invoices"""
+    matrix = quote_matrix([package], [accommodation], {accommodation["destination_id"]: destination}, [duration], [travelers])
+    costs = {
+        "base_package": float(matrix["base_package"][0, 0]) * travelers,
+        "accommodation": float(matrix["accommodation"][0, 0]) * travelers,
+        **{name: fee * travelers for name, fee in TRAVELER_FEES.items()},
+    }
+    return {
+        "destination_factor": destination.get("price_factor") or 1.0,
+        # The discount only applies to nights, so it is 1.0 when no stay is priced
+        "duration_factor": float(duration_factors(duration)) if accommodation.get("price_per_night") else 1.0,
+        "costs": costs,
+        "total": float(matrix["total"][0, 0, 0, 0]),
+    }
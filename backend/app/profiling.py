@@ -0,0 +1,177 @@
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter, OrderedDict
+from contextvars import ContextVar
+
+from .config import settings
+
+# Set while the current request is being profiled
+current_profile = ContextVar("current_profile", default=None)
+
+def _is_handle_run(frame) -> bool:
+    """The asyncio frame every task step and callback runs under"""
+    return frame.f_code.co_name == "_run" and frame.f_code.co_filename.endswith(os.path.join("asyncio", "events.py"))
+
+def folded_stack(frame):
+    """Root-to-leaf 'module.function' names joined by ';', starting below the event loop.
+
+    None when the frame is not running a task step, i.e. the loop is idle.
+    """
+    names = []
+    while frame is not None and not _is_handle_run(frame):
+        code = frame.f_code
+        names.append(f"{frame.f_globals.get('__name__', '?')}.{getattr(code, 'co_qualname', code.co_name)}")
+        frame = frame.f_back
+    if frame is None:
+        return None
+    return ";".join(reversed(names))
+
+class Profile:
+    """Wall-clock profile of one request, as folded stacks weighted in microseconds.
+
+    CPU time comes from sampling the event loop thread and includes anything
+    else the loop ran meanwhile, so profile a request on a quiet worker for a
+    clean picture. Time spent awaiting the database or OpenAI is added under
+    the awaiting call's stack as an '<await db>' or '<await openai>' frame.
+    """
+
+    def __init__(self, method: str, path: str, trigger: str):
+        self.id = uuid.uuid4().hex[:16]
+        self.method = method
+        self.path = path
+        self.trigger = trigger
+        self.started_at = time.time()
+        self.duration = None
+        self.status_code = None
+        self.samples = 0
+        self.stacks = Counter()
+
+    def add_sample(self, stack: str, seconds: float):
+        self.samples += 1
+        self.stacks[stack] += int(seconds * 1_000_000)
+
+    def add_await(self, stack: str, upstream: str, seconds: float):
+        if stack:
+            self.stacks[f"{stack};<await {upstream}>"] += int(seconds * 1_000_000)
+
+    def folded(self) -> str:
+        """One 'frame;frame;frame weight' line per stack, for flamegraph.pl, inferno or speedscope"""
+        return "".join(f"{stack} {weight}\n" for stack, weight in self.stacks.most_common() if weight)
+
+    def summary(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "trigger": self.trigger,
+            "status_code": self.status_code,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration * 1000, 2) if self.duration is not None else None,
+            "samples": self.samples,
+        }
+
+class StackSampler:
+    """Samples one thread's Python stack every `interval` seconds from a background thread"""
+
+    def __init__(self, profile: Profile, thread_id: int, interval: float):
+        self.profile = profile
+        self.thread_id = thread_id
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = folded_stack(frame) if frame is not None else None
+            # A stack captured once stop() has begun only shows the profiler itself
+            if stack and not self._stop.is_set():
+                self.profile.add_sample(stack, self.interval)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+class ProfileStore:
+    """The most recent profiles, kept in memory and optionally written to `directory`"""
+
+    def __init__(self, maxsize: int, directory: str = ""):
+        self.maxsize = maxsize
+        self.directory = directory
+        self._profiles = OrderedDict()
+
+    def add(self, profile: Profile):
+        self._profiles[profile.id] = profile
+        while len(self._profiles) > self.maxsize:
+            self._profiles.popitem(last=False)
+        if self.directory:
+            os.makedirs(self.directory, exist_ok=True)
+            with open(os.path.join(self.directory, f"{profile.id}.folded"), "w") as f:
+                f.write(profile.folded())
+
+    def get(self, profile_id: str):
+        return self._profiles.get(profile_id)
+
+    def summaries(self) -> list:
+        return [p.summary() for p in reversed(self._profiles.values())]
+
+profile_store = ProfileStore(maxsize=settings.PROFILING_MAX_STORED, directory=settings.PROFILING_DIR)
+
+class ProfilingMiddleware:
+    """Profile requests sent with `X-Profile: 1` and a valid X-Admin-Key, or a random sample.
+
+    Only one request per worker is profiled at a time; others run normally.
+    The profile id is returned in the X-Profile-Id response header and the
+    profile is served by GET /api/admin/profiles/{profile_id}.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.active = False
+
+    def trigger(self, scope):
+        headers = dict(scope["headers"])
+        if headers.get(b"x-profile") == b"1":
+            admin_key = headers.get(b"x-admin-key", b"").decode()
+            if settings.ADMIN_API_KEY and admin_key == settings.ADMIN_API_KEY:
+                return "header"
+        if settings.PROFILING_SAMPLE_RATE and random.random() < settings.PROFILING_SAMPLE_RATE:
+            return "sampled"
+        return None
+
+    async def __call__(self, scope, receive, send):
+        trigger = None
+        if scope["type"] == "http" and not self.active:
+            trigger = self.trigger(scope)
+        if trigger is None:
+            await self.app(scope, receive, send)
+            return
+
+        profile = Profile(scope["method"], scope["path"], trigger)
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                message = {**message, "headers": [*message.get("headers", []), (b"x-profile-id", profile.id.encode())]}
+            await send(message)
+
+        self.active = True
+        token = current_profile.set(profile)
+        sampler = StackSampler(profile, threading.get_ident(), settings.PROFILING_INTERVAL)
+        sampler.start()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_profile_id)
+        finally:
+            profile.duration = time.perf_counter() - started
+            sampler.stop()
+            current_profile.reset(token)
+            self.active = False
+            profile_store.add(profile)
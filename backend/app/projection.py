@@ -0,0 +1,29 @@
+from typing import Optional
+
+from fastapi import HTTPException, Query, status
+
+FIELDS_QUERY = Query(None, description="Comma-separated fields to return (id is always included)")
+
+def select_columns(model, fields: Optional[str] = None, computed: tuple = (), required: tuple = ("id",)) -> str:
+    """PostgREST select list for a response model, narrowed to the requested fields.
+
+    Columns follow the model's field order so equal requests share cache
+    entries. `computed` names model fields that are not table columns and
+    `required` columns are always selected (e.g. the id and sort column a
+    cursor is built from).
+    """
+    names = [name for name in model.__fields__ if name not in computed]
+    if fields:
+        requested = {f.strip() for f in fields.split(",") if f.strip()}
+        unknown = requested - set(model.__fields__)
+        if unknown:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail=f"Unknown fields: {', '.join(sorted(unknown))}"
+            )
+        names = [name for name in names if name in requested or name in required]
+    return ",".join(names)
+
+def wants(fields: Optional[str], name: str) -> bool:
+    """Whether a computed field was requested"""
+    return not fields or name in {f.strip() for f in fields.split(",")}
@@ -0,0 +1,160 @@
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+
+from .config import settings
+from .storage.base import RESERVED_PARAMS, parse_condition, parse_group
+
+logger = logging.getLogger(__name__)
+
+def _shape(node: tuple) -> str:
+    if node[0] == "group":
+        _, combinator, nodes = node
+        return f"{combinator}({','.join(_shape(n) for n in nodes)})"
+    _, column, op, _, negate = node
+    return f"{column}.{'not.' if negate else ''}{op}"
+
+def fingerprint(query) -> str:
+    """The shape of a PostgREST query with its values left out.
+
+    e.g. "GET bookings select=* where=user_id.eq,or(created_at.lt,and(created_at.eq,id.gt))
+    order=created_at.desc,id.asc limit", so every call made by one helper with
+    the same options shares a fingerprint.
+    """
+    params = query.params
+    filters = []
+    for key, value in params.multi_items():
+        if key in RESERVED_PARAMS:
+            continue
+        filters.append(_shape(parse_group(key, value) if key in ("or", "and") else parse_condition(key, value)))
+
+    parts = [query.http_method, query.path.strip("/")]
+    if query.http_method == "GET":
+        parts.append(f"select={params.get('select', '*')}")
+    if filters:
+        parts.append(f"where={','.join(filters)}")
+    for order in params.get_list("order"):
+        parts.append(f"order={order}")
+    if "limit" in params or "Range" in query.headers:
+        parts.append("limit")
+    return " ".join(parts)
+
+class QueryStats:
+    __slots__ = ("calls", "errors", "slow_calls", "total_seconds", "max_seconds", "rows", "routes")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.slow_calls = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+        self.rows = 0
+        self.routes = Counter()  # calling route -> calls
+
+    def add(self, other: "QueryStats"):
+        self.calls += other.calls
+        self.errors += other.errors
+        self.slow_calls += other.slow_calls
+        self.total_seconds += other.total_seconds
+        self.max_seconds = max(self.max_seconds, other.max_seconds)
+        self.rows += other.rows
+        self.routes.update(other.routes)
+
+    def to_dict(self, fingerprint: str) -> dict:
+        return {
+            "fingerprint": fingerprint,
+            "calls": self.calls,
+            "errors": self.errors,
+            "slow_calls": self.slow_calls,
+            "total_ms": round(self.total_seconds * 1000, 2),
+            "mean_ms": round(self.total_seconds / self.calls * 1000, 2),
+            "max_ms": round(self.max_seconds * 1000, 2),
+            "mean_rows": round(self.rows / self.calls, 1),
+            "routes": dict(self.routes.most_common(5)),
+        }
+
+class QueryLog:
+    """Per-fingerprint timing of database calls, and a log of the slow ones.
+
+    Aggregates cover the current and the previous `window` seconds, so the
+    top queries reflect recent traffic. Calls taking `slow_threshold` seconds
+    or longer are logged with their calling route and kept in `slow`.
+    """
+
+    SORTS = {
+        "total": lambda s: s.total_seconds,
+        "mean": lambda s: s.total_seconds / s.calls,
+        "max": lambda s: s.max_seconds,
+        "calls": lambda s: s.calls,
+        "rows": lambda s: s.rows,
+    }
+
+    def __init__(self, slow_threshold: float, window: float, max_fingerprints: int, slow_log_size: int):
+        self.slow_threshold = slow_threshold
+        self.window = window
+        self.max_fingerprints = max_fingerprints
+        self.slow = deque(maxlen=slow_log_size)
+        self._current = OrderedDict()  # fingerprint -> QueryStats
+        self._previous = {}
+        self._window_started = time.monotonic()
+
+    def record(self, query, seconds: float, response=None, route: str = None):
+        now = time.monotonic()
+        if now - self._window_started >= self.window:
+            # Keep one full window behind the current one; anything older is dropped
+            self._previous = self._current if now - self._window_started < 2 * self.window else {}
+            self._current = OrderedDict()
+            self._window_started = now
+
+        key = fingerprint(query)
+        stats = self._current.get(key)
+        if stats is None:
+            stats = self._current[key] = QueryStats()
+            if len(self._current) > self.max_fingerprints:
+                self._current.popitem(last=False)
+        else:
+            self._current.move_to_end(key)
+
+        route = route or "-"
+        stats.calls += 1
+        stats.total_seconds += seconds
+        stats.max_seconds = max(stats.max_seconds, seconds)
+        stats.routes[route] += 1
+        if response is None:
+            stats.errors += 1
+        elif isinstance(response.data, list):
+            stats.rows += len(response.data)
+
+        if seconds >= self.slow_threshold:
+            stats.slow_calls += 1
+            logger.warning("Slow query (%.1f ms) from %s: %s", seconds * 1000, route, key)
+            self.slow.append({
+                "at": time.time(),
+                "duration_ms": round(seconds * 1000, 2),
+                "route": route,
+                "fingerprint": key,
+                "failed": response is None,
+            })
+
+    def top(self, limit: int = 20, sort: str = "total") -> list:
+        merged = {}
+        for window in (self._previous, self._current):
+            for key, stats in window.items():
+                merged.setdefault(key, QueryStats()).add(stats)
+        ranked = sorted(merged.items(), key=lambda item: self.SORTS[sort](item[1]), reverse=True)
+        return [stats.to_dict(key) for key, stats in ranked[:limit]]
+
+    def stats(self, limit: int = 20, sort: str = "total") -> dict:
+        return {
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "window_seconds": self.window,
+            "top": self.top(limit, sort),
+            "slow": list(reversed(self.slow)),
+        }
+
+query_log = QueryLog(
+    slow_threshold=settings.QUERY_SLOW_THRESHOLD,
+    window=settings.QUERY_STATS_WINDOW,
+    max_fingerprints=settings.QUERY_STATS_MAX_FINGERPRINTS,
+    slow_log_size=settings.QUERY_SLOW_LOG_SIZE,
+)
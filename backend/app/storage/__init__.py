@@ -0,0 +1 @@
+# Module initialization
\ No newline at end of file
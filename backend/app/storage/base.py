@@ -0,0 +1,199 @@
+"""PostgREST emulation shared by the local storage backends.
+
+A storage backend is an httpx transport plugged into the PostgREST client in
+app.database, so every database helper runs unchanged against it. The
+transport parses the subset of the PostgREST API those helpers use and hands
+a StorageRequest to the backend.
+"""
+import asyncio
+import json
+import re
+from urllib.parse import unquote
+
+import httpx
+
+RESERVED_PARAMS = {"select", "order", "limit", "offset", "on_conflict", "columns"}
+
+class StorageError(Exception):
+    def __init__(self, message: str, status_code: int = 400, code: str = "PGRST100"):
+        super().__init__(message)
+        self.status_code = status_code
+        self.code = code
+
+def split_list(raw: str) -> list:
+    """Split a PostgREST list value such as (a,"b,c") into its items"""
+    items, current, quoted, escaped = [], "", False, False
+    for char in raw.strip("()"):
+        if escaped:
+            current += char
+            escaped = False
+        elif char == "\\" and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == "," and not quoted:
+            items.append(current)
+            current = ""
+        else:
+            current += char
+    items.append(current)
+    return items
+
+def split_top_level(raw: str) -> list:
+    """Split on commas outside parentheses and double quotes, keeping quotes and escapes"""
+    parts, depth, quoted, escaped, current = [], 0, False, False, ""
+    for char in raw:
+        if escaped:
+            escaped = False
+        elif char == "\\" and quoted:
+            escaped = True
+        elif char == '"':
+            quoted = not quoted
+        elif char == "(" and not quoted:
+            depth += 1
+        elif char == ")" and not quoted:
+            depth -= 1
+        elif char == "," and depth == 0 and not quoted:
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    parts.append(current)
+    return parts
+
+def unquote_value(raw: str) -> str:
+    """The literal of a double-quoted PostgREST value, undoing backslash escapes"""
+    return re.sub(r"\\(.)", r"\1", raw[1:-1], flags=re.DOTALL)
+
+def parse_condition(column: str, expression: str, quoted: bool = False) -> tuple:
+    """("cond", column, op, value, negate) for a filter such as not.eq.5"""
+    negate = expression.startswith("not.")
+    if negate:
+        expression = expression[4:]
+    op, _, raw = expression.partition(".")
+    if op == "in":
+        value = split_list(raw)
+    elif quoted and len(raw) > 1 and raw[0] == raw[-1] == '"':
+        value = unquote_value(raw)
+    else:
+        value = raw
+    return ("cond", column, op, value, negate)
+
+def parse_group(combinator: str, raw: str) -> tuple:
+    """("group", "or"|"and", nodes) for or=(a.eq.1,and(b.gt.2,c.lt.3)) style filters"""
+    nodes = []
+    for part in split_top_level(raw[1:-1]):
+        if part.startswith(("and(", "or(")):
+            name, _, rest = part.partition("(")
+            nodes.append(parse_group(name, "(" + rest))
+        else:
+            column, _, expression = part.partition(".")
+            nodes.append(parse_condition(column, expression, quoted=True))
+    return ("group", combinator, nodes)
+
+class StorageRequest:
+    """One PostgREST call: the table, its filters and what to return"""
+
+    def __init__(self, request: httpx.Request):
+        self.method = request.method
+        self.table = unquote(request.url.path.rstrip("/").rsplit("/", 1)[-1])
+        params = request.url.params
+
+        self.filters = []
+        for key, value in params.multi_items():
+            if key in RESERVED_PARAMS:
+                continue
+            if key in ("or", "and"):
+                self.filters.append(parse_group(key, value))
+            else:
+                self.filters.append(parse_condition(key, value))
+
+        self.order = []  # (column, descending, nulls first)
+        for order in params.get_list("order"):
+            for term in order.split(","):
+                column, *modifiers = term.split(".")
+                descending = "desc" in modifiers
+                nulls_first = "nullsfirst" in modifiers or (descending and "nullslast" not in modifiers)
+                self.order.append((column, descending, nulls_first))
+
+        select = params.get("select", "*")
+        self.columns = [c.strip() for c in split_top_level(select) if "(" not in c]
+        if "*" in self.columns:
+            self.columns = None
+
+        self.offset = int(params.get("offset", 0))
+        self.limit = int(params["limit"]) if "limit" in params else None
+        if "Range" in request.headers:
+            start, _, end = request.headers["Range"].partition("-")
+            self.offset, self.limit = int(start), int(end) - int(start) + 1
+
+        self.count = "count=" in request.headers.get("Prefer", "")
+        self.payload = json.loads(request.content) if request.content else None
+
+    @property
+    def rows(self) -> list:
+        """Rows to insert, for POST"""
+        return self.payload if isinstance(self.payload, list) else [self.payload or {}]
+
+class StorageTransport(httpx.AsyncBaseTransport):
+    """Answers PostgREST requests from a local backend.
+
+    Subclasses implement select(), insert(), update() and delete(). Every call
+    waits `latency` seconds first, to stand in for the network, and is
+    recorded so benchmarks can count round-trips.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.calls = []  # (method, table, query string)
+
+    @property
+    def round_trips(self):
+        return len(self.calls)
+
+    def reset_calls(self):
+        self.calls = []
+
+    def select(self, request: StorageRequest) -> tuple:
+        """Return (rows, total matching rows before limit/offset)"""
+        raise NotImplementedError
+
+    def insert(self, request: StorageRequest) -> list:
+        raise NotImplementedError
+
+    def update(self, request: StorageRequest) -> list:
+        raise NotImplementedError
+
+    def delete(self, request: StorageRequest) -> list:
+        raise NotImplementedError
+
+    @staticmethod
+    def _response(status_code: int, body, headers: dict = None):
+        return httpx.Response(
+            status_code,
+            headers={"Content-Type": "application/json", **(headers or {})},
+            content=json.dumps(body, default=str).encode(),
+        )
+
+    async def handle_async_request(self, request):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        self.calls.append((request.method, unquote(request.url.path.rsplit("/", 1)[-1]), str(request.url.params)))
+
+        try:
+            call = StorageRequest(request)
+            if call.method == "GET":
+                rows, total = self.select(call)
+                headers = {}
+                if call.count:
+                    headers["Content-Range"] = f"{call.offset}-{call.offset + max(len(rows) - 1, 0)}/{total}"
+                return self._response(200, rows, headers)
+            if call.method == "POST":
+                return self._response(201, self.insert(call))
+            if call.method == "PATCH":
+                return self._response(200, self.update(call))
+            if call.method == "DELETE":
+                return self._response(200, self.delete(call))
+        except StorageError as e:
+            return self._response(e.status_code, {"message": str(e), "code": e.code, "details": None, "hint": None})
+        return httpx.Response(405)
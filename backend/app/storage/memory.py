@@ -0,0 +1,130 @@
+import re
+import uuid
+from datetime import datetime, timezone
+
+from .base import StorageError, StorageTransport
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _coerce(raw, sample):
+    """Convert a filter value from the query string to the type of the column"""
+    if raw == "null":
+        return None
+    if isinstance(sample, bool):
+        return raw == "true"
+    if isinstance(sample, (int, float)):
+        try:
+            return float(raw)
+        except ValueError:
+            raise StorageError(f'invalid input syntax for type numeric: "{raw}"', 400, "22P02")
+    return raw
+
+def _like(pattern: str, value, ignore_case: bool) -> bool:
+    if value is None:
+        return False
+    regex = ".*".join(re.escape(part) for part in re.split(r"[*%]", pattern))
+    return re.fullmatch(regex, str(value), re.IGNORECASE if ignore_case else 0) is not None
+
+def _compare(op, value, raw):
+    if op == "in":
+        return value is not None and str(value) in raw
+    if op == "is":
+        return value is None if raw == "null" else value == (raw == "true")
+    if op in ("like", "ilike"):
+        return _like(raw, value, op == "ilike")
+    target = _coerce(raw, value)
+    if op == "eq":
+        return value == target
+    if op == "neq":
+        return value != target
+    if value is None or target is None:
+        return False
+    return {
+        "gt": value > target,
+        "gte": value >= target,
+        "lt": value < target,
+        "lte": value <= target,
+    }[op]
+
+def _matches(row: dict, node: tuple) -> bool:
+    if node[0] == "group":
+        _, combinator, nodes = node
+        results = (_matches(row, child) for child in nodes)
+        return any(results) if combinator == "or" else all(results)
+    _, column, op, value, negate = node
+    result = _compare(op, row.get(column), value)
+    return not result if negate else result
+
+class MemoryTransport(StorageTransport):
+    """Storage backend holding each table as a plain list of row dicts.
+
+    `defaults` maps a table to {column: value or zero-argument callable} for
+    columns an insert leaves out; every table gets an id and created_at.
+    """
+
+    def __init__(self, tables: dict = None, latency: float = 0.0, defaults: dict = None):
+        super().__init__(latency)
+        self.tables = {name: list(rows) for name, rows in (tables or {}).items()}
+        self.defaults = defaults or {}
+
+    @classmethod
+    def from_schema(cls, schema_path: str = None, latency: float = 0.0):
+        """Tables, column defaults and sample rows from database/schema.sql"""
+        from .sqlite import read_schema
+        tables, defaults = read_schema(schema_path)
+        return cls(tables, latency=latency, defaults=defaults)
+
+    def _filter(self, rows: list, filters: list) -> list:
+        for node in filters:
+            rows = [row for row in rows if _matches(row, node)]
+        return rows
+
+    @staticmethod
+    def _order(rows: list, order: list) -> list:
+        for column, descending, nulls_first in reversed(order):
+            present = [r for r in rows if r.get(column) is not None]
+            missing = [r for r in rows if r.get(column) is None]
+            present.sort(key=lambda r: r[column], reverse=descending)
+            rows = missing + present if nulls_first else present + missing
+        return rows
+
+    @staticmethod
+    def _project(rows: list, columns: list) -> list:
+        if columns is None:
+            return [dict(r) for r in rows]
+        return [{c: r.get(c) for c in columns} for r in rows]
+
+    def _new_row(self, table: str, values: dict) -> dict:
+        row = {"id": str(uuid.uuid4()), "created_at": _now()}
+        for column, default in self.defaults.get(table, {}).items():
+            row[column] = default() if callable(default) else default
+        row.update(values)
+        return row
+
+    def select(self, request):
+        rows = self._order(self._filter(self.tables.setdefault(request.table, []), request.filters), request.order)
+        end = request.offset + request.limit if request.limit is not None else None
+        return self._project(rows[request.offset:end], request.columns), len(rows)
+
+    def insert(self, request):
+        rows = self.tables.setdefault(request.table, [])
+        created = []
+        for values in request.rows:
+            row = self._new_row(request.table, values)
+            rows.append(row)
+            created.append(dict(row))
+        return self._project(created, request.columns)
+
+    def update(self, request):
+        matched = self._filter(self.tables.setdefault(request.table, []), request.filters)
+        for row in matched:
+            row.update(request.payload or {})
+        return self._project(matched, request.columns)
+
+    def delete(self, request):
+        rows = self.tables.setdefault(request.table, [])
+        matched = self._filter(rows, request.filters)
+        matched_ids = {id(r) for r in matched}
+        self.tables[request.table] = [r for r in rows if id(r) not in matched_ids]
+        return self._project(matched, request.columns)
@@ -0,0 +1,233 @@
+import json
+import re
+import sqlite3
+import threading
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+
+from .base import StorageError, StorageTransport
+
+SCHEMA_PATH = Path(__file__).resolve().parents[2] / "database" / "schema.sql"
+
+# Postgres-only pieces of database/schema.sql and their SQLite equivalents
+SCHEMA_REWRITES = (
+    (re.compile(r"^\s*CREATE EXTENSION[^;]*;", re.IGNORECASE | re.MULTILINE), ""),
+    (re.compile(r"^\s*ALTER TABLE[^;]*ENABLE ROW LEVEL SECURITY;", re.IGNORECASE | re.MULTILINE), ""),
+    (re.compile(r"^\s*CREATE POLICY[^;]*;", re.IGNORECASE | re.MULTILINE), ""),
+    (re.compile(r"\bTIMESTAMP WITH TIME ZONE\b", re.IGNORECASE), "TEXT"),
+    (re.compile(r"\bUUID\b"), "TEXT"),
+    (re.compile(r"::jsonb\b", re.IGNORECASE), ""),
+    (re.compile(r"\bDEFAULT (\w+\(\))", re.IGNORECASE), r"DEFAULT (\1)"),
+)
+
+FUNCTIONS = {
+    "uuid_generate_v4": lambda: str(uuid.uuid4()),
+    "now": lambda: datetime.now(timezone.utc).isoformat(),
+}
+
+SQL_OPERATORS = {"eq": "=", "neq": "<>", "gt": ">", "gte": ">=", "lt": "<", "lte": "<=", "like": "LIKE", "ilike": "LIKE"}
+
+def sqlite_schema(sql: str) -> str:
+    """Translate database/schema.sql (tables, indexes and sample data) to SQLite"""
+    for pattern, replacement in SCHEMA_REWRITES:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+def connect(path: str = ":memory:", schema_path: str = None) -> sqlite3.Connection:
+    """Open a SQLite database, creating and seeding the schema when it is new"""
+    connection = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+    connection.row_factory = sqlite3.Row
+    for name, function in FUNCTIONS.items():
+        connection.create_function(name, 0, function)
+    connection.execute("PRAGMA case_sensitive_like = ON")
+    exists = connection.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'users'").fetchone()
+    if not exists:
+        schema = Path(schema_path or SCHEMA_PATH).read_text()
+        connection.executescript(f"BEGIN;\n{sqlite_schema(schema)}\nCOMMIT;")
+    return connection
+
+def _table_columns(connection: sqlite3.Connection) -> dict:
+    """{table: {column: (declared type, default expression)}}"""
+    tables = {}
+    for (table,) in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'"):
+        tables[table] = {
+            column["name"]: (column["type"].upper(), column["dflt_value"])
+            for column in connection.execute(f'PRAGMA table_info("{table}")')
+        }
+    return tables
+
+def _decode(value, declared: str):
+    if value is None:
+        return None
+    if declared == "JSONB" and isinstance(value, str):
+        return json.loads(value)
+    if declared == "BOOLEAN":
+        return bool(value)
+    return value
+
+def read_schema(schema_path: str = None) -> tuple:
+    """Sample rows and column defaults for MemoryTransport, from a seeded SQLite copy"""
+    connection = connect(":memory:", schema_path)
+    tables, defaults = {}, {}
+    for table, columns in _table_columns(connection).items():
+        tables[table] = [
+            {name: _decode(row[name], columns[name][0]) for name in row.keys()}
+            for row in connection.execute(f'SELECT * FROM "{table}"')
+        ]
+        defaults[table] = {}
+        for name, (declared, expression) in columns.items():
+            if expression is None:
+                continue
+            function = FUNCTIONS.get(expression.strip("()").replace("()", ""))
+            if function:
+                defaults[table][name] = function
+            else:
+                defaults[table][name] = _decode(connection.execute(f"SELECT {expression}").fetchone()[0], declared)
+    connection.close()
+    return tables, defaults
+
+class SQLiteTransport(StorageTransport):
+    """Storage backend translating PostgREST calls to SQL on a SQLite database.
+
+    JSONB columns are stored as JSON text and decoded on the way out. Queries
+    run on the event loop thread; they are local and short, and one
+    connection serves every request.
+    """
+
+    def __init__(self, path: str = ":memory:", latency: float = 0.0, schema_path: str = None):
+        super().__init__(latency)
+        self.connection = connect(path, schema_path)
+        self.columns = _table_columns(self.connection)
+        self._lock = threading.Lock()
+
+    def _table(self, table: str) -> dict:
+        columns = self.columns.get(table)
+        if columns is None:
+            raise StorageError(f'relation "public.{table}" does not exist', 404, "42P01")
+        return columns
+
+    @staticmethod
+    def _column(columns: dict, table: str, column: str) -> str:
+        if column not in columns:
+            raise StorageError(f"column {table}.{column} does not exist", 400, "42703")
+        return f'"{column}"'
+
+    def _bind(self, declared: str, value):
+        if declared == "BOOLEAN" and value in ("true", "false"):
+            return value == "true"
+        return value
+
+    def _condition(self, columns: dict, table: str, node: tuple, params: list) -> str:
+        if node[0] == "group":
+            _, combinator, nodes = node
+            joined = f" {combinator.upper()} ".join(self._condition(columns, table, n, params) for n in nodes)
+            return f"({joined})"
+
+        _, column, op, value, negate = node
+        name = self._column(columns, table, column)
+        declared = columns[column][0]
+        if op == "in":
+            params.extend(self._bind(declared, v) for v in value)
+            sql = f"{name} IN ({', '.join('?' * len(value))})"
+        elif op == "is":
+            sql = f"{name} IS NULL" if value == "null" else f"{name} = {1 if value == 'true' else 0}"
+        elif op in SQL_OPERATORS:
+            if op == "ilike":
+                name, value = f"lower({name})", value.lower()
+            if op in ("like", "ilike"):
+                value = value.replace("*", "%")
+            params.append(self._bind(declared, value))
+            sql = f"{name} {SQL_OPERATORS[op]} ?"
+        else:
+            raise StorageError(f'unknown operator "{op}"', 400, "PGRST100")
+        return f"NOT ({sql})" if negate else sql
+
+    def _where(self, request, columns: dict, params: list) -> str:
+        if not request.filters:
+            return ""
+        return " WHERE " + " AND ".join(self._condition(columns, request.table, n, params) for n in request.filters)
+
+    def _returning(self, request, columns: dict) -> str:
+        if request.columns is None:
+            return "*"
+        return ", ".join(self._column(columns, request.table, c) for c in request.columns)
+
+    def _rows(self, cursor, columns: dict) -> list:
+        return [{name: _decode(row[name], columns[name][0]) for name in row.keys()} for row in cursor]
+
+    def _values(self, columns: dict, table: str, values: dict) -> dict:
+        encoded = {}
+        for column, value in values.items():
+            self._column(columns, table, column)
+            if columns[column][0] == "JSONB" and value is not None:
+                value = json.dumps(value)
+            encoded[column] = value
+        return encoded
+
+    def _run(self, statements):
+        """Run (sql, params) pairs in one transaction and return the last cursor's rows"""
+        with self._lock:
+            try:
+                self.connection.execute("BEGIN")
+                results = [self.connection.execute(sql, params).fetchall() for sql, params in statements]
+                self.connection.execute("COMMIT")
+            except sqlite3.Error as e:
+                self.connection.execute("ROLLBACK")
+                code = "23505" if isinstance(e, sqlite3.IntegrityError) else "PGRST100"
+                raise StorageError(str(e), 409 if code == "23505" else 400, code)
+        return results
+
+    def select(self, request):
+        columns = self._table(request.table)
+        params = []
+        where = self._where(request, columns, params)
+        order = ", ".join(
+            f"{self._column(columns, request.table, column)} {'DESC' if descending else 'ASC'}"
+            f" NULLS {'FIRST' if nulls_first else 'LAST'}"
+            for column, descending, nulls_first in request.order
+        )
+        sql = f'SELECT {self._returning(request, columns)} FROM "{request.table}"{where}'
+        if order:
+            sql += f" ORDER BY {order}"
+        sql += " LIMIT ? OFFSET ?"
+        statements = [(sql, params + [-1 if request.limit is None else request.limit, request.offset])]
+        if request.count:
+            statements.append((f'SELECT COUNT(*) FROM "{request.table}"{where}', params))
+
+        results = self._run(statements)
+        rows = self._rows(results[0], columns)
+        return rows, results[1][0][0] if request.count else len(rows)
+
+    def insert(self, request):
+        columns = self._table(request.table)
+        returning = self._returning(request, columns)
+        statements = []
+        for values in request.rows:
+            encoded = self._values(columns, request.table, values)
+            if encoded:
+                names = ", ".join(f'"{c}"' for c in encoded)
+                placeholders = ", ".join("?" * len(encoded))
+                sql = f'INSERT INTO "{request.table}" ({names}) VALUES ({placeholders}) RETURNING {returning}'
+            else:
+                sql = f'INSERT INTO "{request.table}" DEFAULT VALUES RETURNING {returning}'
+            statements.append((sql, list(encoded.values())))
+        return [row for rows in self._run(statements) for row in self._rows(rows, columns)]
+
+    def update(self, request):
+        columns = self._table(request.table)
+        encoded = self._values(columns, request.table, request.payload or {})
+        if not encoded:
+            return []
+        params = list(encoded.values())
+        assignments = ", ".join(f'"{c}" = ?' for c in encoded)
+        where = self._where(request, columns, params)
+        sql = f'UPDATE "{request.table}" SET {assignments}{where} RETURNING {self._returning(request, columns)}'
+        return self._rows(self._run([(sql, params)])[0], columns)
+
+    def delete(self, request):
+        columns = self._table(request.table)
+        params = []
+        where = self._where(request, columns, params)
+        sql = f'DELETE FROM "{request.table}"{where} RETURNING {self._returning(request, columns)}'
+        return self._rows(self._run([(sql, params)])[0], columns)
@@ -0,0 +1,5 @@
+# Benchmarks run against an in-process fake of the Supabase REST API, never a real project
+import os
+
+os.environ["SUPABASE_URL"] = "http://fake-supabase.local"
+os.environ["SUPABASE_KEY"] = "benchmark-key"
@@ -0,0 +1,127 @@
+"""Concurrency stress test for capacity-safe booking creation.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_booking_capacity
+
+Fires thousands of concurrent POST /api/bookings requests at a few hot
+accommodations and packages and at many unrelated ones, then recomputes
+occupancy from the fake bookings table. Exits non-zero if any accommodation
+night or package departure is overbooked, or if a request that fits was
+refused.
+"""
+import asyncio
+import sys
+import time
+from collections import Counter
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from .fake_postgrest import FakePostgrest, install, make_catalog
+from app.main import app
+from app.auth.utils import create_access_token
+from app.availability import availability_index, package_seats
+
+LATENCY = 0.005
+HOT_REQUESTS = 1000
+SPREAD_ACCOMMODATIONS = 100
+SPREAD_REQUESTS = 2000
+
+def seed():
+    tables = make_catalog(destinations=10, accommodations_per_destination=SPREAD_ACCOMMODATIONS // 10 + 1, packages=2)
+    user = {"id": "user-1", "email": "bench@example.com", "name": "Bench", "preferences": {}, "password_hash": "x"}
+    tables["users"].append(user)
+    for accommodation in tables["accommodations"]:
+        accommodation["capacity"] = 10
+    tables["packages"][0]["capacity"] = 1_000_000  # Only accommodation capacity limits these bookings
+    tables["packages"][1]["capacity"] = 6
+    return tables, user
+
+def booking_body(user, accommodation, package, departure: date, nights: int):
+    return {
+        "user_id": user["id"],
+        "destination_id": accommodation["destination_id"],
+        "accommodation_id": accommodation["id"],
+        "package_id": package["id"],
+        "departure_date": departure.isoformat(),
+        "return_date": (departure + timedelta(days=nights)).isoformat(),
+        "travelers": 1,
+    }
+
+async def fire(client, headers, bodies):
+    started = time.perf_counter()
+    responses = await asyncio.gather(*(client.post("/api/bookings/", json=b, headers=headers) for b in bodies))
+    elapsed = time.perf_counter() - started
+    return Counter(r.status_code for r in responses), elapsed
+
+def overbooked(tables):
+    """Accommodation nights and package departures whose bookings exceed capacity"""
+    capacity = {row["id"]: row["capacity"] for row in tables["accommodations"] + tables["packages"]}
+    usage = Counter()
+    for booking in tables["bookings"]:
+        if booking["status"] == "Cancelled":
+            continue
+        departure = datetime.fromisoformat(booking["departure_date"]).date()
+        nights = (datetime.fromisoformat(booking["return_date"]).date() - departure).days
+        for night in range(nights):
+            usage[booking["accommodation_id"], departure + timedelta(days=night)] += booking["travelers"]
+        usage[booking["package_id"], departure] += booking["travelers"]
+    return {key: used for key, used in usage.items() if used > capacity[key[0]]}
+
+async def run_scenarios(tables, user):
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user['id']})}"}
+    departure = date.today() + timedelta(days=30)
+    roomy, tight = tables["packages"]
+    accommodations = tables["accommodations"]
+    expected = {}
+    results = {}
+
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        # Everyone wants the same nights at one accommodation
+        hot = accommodations[0]
+        results["hot accommodation"] = await fire(
+            client, headers, [booking_body(user, hot, roomy, departure, 3) for _ in range(HOT_REQUESTS)]
+        )
+        expected["hot accommodation"] = hot["capacity"]
+
+        # Everyone wants the same launch of a small package, at different accommodations
+        bodies = [booking_body(user, accommodations[1 + i % 50], tight, departure + timedelta(days=10), 2) for i in range(HOT_REQUESTS)]
+        results["hot package"] = await fire(client, headers, bodies)
+        expected["hot package"] = tight["capacity"]
+
+        # Unrelated accommodations must not be serialised behind each other
+        spread = accommodations[1:1 + SPREAD_ACCOMMODATIONS]
+        bodies = [booking_body(user, spread[i % len(spread)], roomy, departure + timedelta(days=20), 4) for i in range(SPREAD_REQUESTS)]
+        results["spread"] = await fire(client, headers, bodies)
+        expected["spread"] = sum(a["capacity"] for a in spread)
+
+    return results, expected
+
+def run():
+    tables, user = seed()
+    fake = install(FakePostgrest(tables, latency=LATENCY))
+    availability_index.invalidate()
+    package_seats.invalidate()
+
+    results, expected = asyncio.run(run_scenarios(tables, user))
+
+    failed = False
+    for name, (statuses, elapsed) in results.items():
+        requests = sum(statuses.values())
+        print(
+            f"{name:<18} {requests:5d} requests in {elapsed:6.2f} s ({requests / elapsed:7.0f} req/s)   "
+            f"201: {statuses[201]:4d}   409: {statuses[409]:4d}   expected 201: {expected[name]}"
+        )
+        if statuses[201] != expected[name] or statuses[201] + statuses[409] != requests:
+            failed = True
+
+    violations = overbooked(fake.tables)
+    print(f"overbooked accommodation nights / package departures: {len(violations)}")
+    if violations or failed:
+        print("FAIL: capacity was exceeded or bookings that fit were refused")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,103 @@
+"""Latency benchmark for booking detail and invoice enrichment.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_booking_detail
+
+Every fake database call sleeps for LATENCY seconds and the catalog cache is
+cleared before each request, so timings reflect the number of sequential
+round-trips on the request's critical path.
+"""
+import asyncio
+import statistics
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from .fake_postgrest import FakePostgrest, install, make_catalog
+from app.main import app
+from app.auth.utils import create_access_token
+from app.bookings.router import get_booking_references
+from app.loaders import Loaders
+from app.database import (
+    get_destination_by_id, get_accommodation_by_id, get_package_by_id, invalidate_catalog
+)
+
+LATENCY = 0.02
+ITERATIONS = 20
+
+def seed():
+    tables = make_catalog()
+    user = {"id": "user-1", "email": "bench@example.com", "name": "Bench", "preferences": {}, "password_hash": "x"}
+    accommodation = tables["accommodations"][0]
+    booking = {
+        "id": "booking-00000001",
+        "user_id": user["id"],
+        "departure_date": "2030-01-01T00:00:00",
+        "return_date": "2030-01-08T00:00:00",
+        "destination_id": accommodation["destination_id"],
+        "accommodation_id": accommodation["id"],
+        "package_id": tables["packages"][0]["id"],
+        "travelers": 2,
+        "special_requests": None,
+        "total_price": 100000.0,
+        "status": "Confirmed",
+        "created_at": "2029-01-01T00:00:00",
+    }
+    tables["users"].append(user)
+    tables["bookings"].append(booking)
+    return tables, user, booking
+
+async def sequential_references(booking):
+    """The enrichment pattern used before lookups were gathered"""
+    destination = await get_destination_by_id(booking["destination_id"])
+    accommodation = await get_accommodation_by_id(booking["accommodation_id"])
+    package = await get_package_by_id(booking["package_id"])
+    return destination, accommodation, package
+
+async def gathered_references(booking):
+    return await get_booking_references(booking, Loaders())
+
+async def time_enrichment(loader, booking):
+    samples = []
+    for _ in range(ITERATIONS):
+        invalidate_catalog()
+        started = time.perf_counter()
+        await loader(booking)
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def time_endpoint(client, path, headers):
+    samples = []
+    for _ in range(ITERATIONS):
+        invalidate_catalog()
+        started = time.perf_counter()
+        client.get(path, headers=headers).raise_for_status()
+        samples.append(time.perf_counter() - started)
+    return samples
+
+def report(name, samples):
+    print(f"{name:<32} p50 {statistics.median(samples) * 1000:7.2f} ms   max {max(samples) * 1000:7.2f} ms")
+
+def run():
+    tables, user, booking = seed()
+    install(FakePostgrest(tables, latency=LATENCY))
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user['id']})}"}
+
+    before = asyncio.run(time_enrichment(sequential_references, booking))
+    after = asyncio.run(time_enrichment(gathered_references, booking))
+    report("enrichment, sequential (before)", before)
+    report("enrichment, gathered (after)", after)
+
+    with TestClient(app) as client:
+        report("GET /api/bookings/{id}", time_endpoint(client, f"/api/bookings/{booking['id']}", headers))
+        report("GET /api/bookings/{id}/invoice", time_endpoint(client, f"/api/bookings/{booking['id']}/invoice", headers))
+
+    if statistics.median(after) >= statistics.median(before):
+        print("FAIL: gathered enrichment is not faster than sequential")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,92 @@
+"""Round-trip benchmark for group bookings.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_bulk_booking
+
+Creates groups of bookings spread over several accommodations and packages,
+once as repeated POST /api/bookings and once as a single POST
+/api/bookings/bulk, with cold caches each time. Exits non-zero if the bulk
+endpoint's database round-trips grow with the group size.
+"""
+import sys
+import time
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+
+from .fake_postgrest import FakePostgrest, install, make_catalog
+from app.main import app
+from app.auth.utils import create_access_token
+from app.availability import availability_index, package_seats
+from app.database import invalidate_catalog
+
+LATENCY = 0.002
+SIZES = (1, 5, 20, 50)
+
+def seed():
+    tables = make_catalog(destinations=5, accommodations_per_destination=4, packages=3)
+    user = {"id": "user-1", "email": "bench@example.com", "name": "Bench", "preferences": {}, "password_hash": "x"}
+    tables["users"].append(user)
+    for row in tables["accommodations"] + tables["packages"]:
+        row["capacity"] = 1000
+    return tables, user
+
+def group(tables, user, size: int):
+    departure = date.today() + timedelta(days=30)
+    bookings = []
+    for i in range(size):
+        accommodation = tables["accommodations"][i % len(tables["accommodations"])]
+        bookings.append({
+            "user_id": user["id"],
+            "destination_id": accommodation["destination_id"],
+            "accommodation_id": accommodation["id"],
+            "package_id": tables["packages"][i % len(tables["packages"])]["id"],
+            "departure_date": departure.isoformat(),
+            "return_date": (departure + timedelta(days=7)).isoformat(),
+            "travelers": 2,
+        })
+    return bookings
+
+def measure(client, fake, send):
+    invalidate_catalog()
+    availability_index.invalidate()
+    package_seats.invalidate()
+    fake.reset_calls()
+    started = time.perf_counter()
+    send()
+    return fake.round_trips, time.perf_counter() - started
+
+def run():
+    tables, user = seed()
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': user['id']})}"}
+
+    bulk_round_trips = []
+    with TestClient(app) as client:
+        fake = install(FakePostgrest(tables, latency=LATENCY))
+        print(f"{'group size':>10}   {'single POSTs':>22}   {'bulk POST':>22}")
+        for size in SIZES:
+            bookings = group(tables, user, size)
+
+            def send_single():
+                for booking in bookings:
+                    client.post("/api/bookings/", json=booking, headers=headers).raise_for_status()
+
+            def send_bulk():
+                client.post("/api/bookings/bulk", json={"bookings": bookings}, headers=headers).raise_for_status()
+
+            single = measure(client, fake, send_single)
+            bulk = measure(client, fake, send_bulk)
+            bulk_round_trips.append(bulk[0])
+            print(
+                f"{size:>10}   {single[0]:5d} calls {single[1] * 1000:8.1f} ms   "
+                f"{bulk[0]:5d} calls {bulk[1] * 1000:8.1f} ms"
+            )
+
+    if len(set(bulk_round_trips)) > 1:
+        print("FAIL: bulk booking round-trips grow with the group size")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
@@ -0,0 +1,42 @@
+"""Round-trip regression benchmark for GET /api/destinations.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_destinations
+
+Exits non-zero if the number of database round-trips grows with the number of
+destinations (the N+1 pattern).
+"""
+import sys
+import time
+
+from fastapi.testclient import TestClient
+
+from .fake_postgrest import FakePostgrest, install, make_catalog
+from app.main import app
+
+SIZES = (4, 16, 64, 256)
+
+def run():
+    results = []
+    with TestClient(app) as client:
+        for size in SIZES:
+            fake = install(FakePostgrest(make_catalog(destinations=size, accommodations_per_destination=3)))
+            started = time.perf_counter()
+            response = client.get("/api/destinations/")
+            elapsed = time.perf_counter() - started
+            response.raise_for_status()
+            assert len(response.json()) == size
+            results.append((size, fake.round_trips, elapsed))
+
+    print(f"{'destinations':>12} {'round_trips':>11} {'ms':>8}")
+    for size, round_trips, elapsed in results:
+        print(f"{size:>12} {round_trips:>11} {elapsed * 1000:>8.2f}")
+
+    if len({round_trips for _, round_trips, _ in results}) != 1:
+        print("FAIL: round-trips grow with the number of destinations")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(run())
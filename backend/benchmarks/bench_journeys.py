@@ -0,0 +1,275 @@
+"""End-to-end load benchmark driving scripted user journeys through the API.
+
+Run from the backend directory:
+
+    python -m benchmarks.bench_journeys --users 20 --journeys 5 --json results.json
+    python -m benchmarks.bench_journeys --baseline results.json
+
+Each virtual user repeatedly registers, logs in, browses destinations,
+filters accommodations, quotes a package, books it, views the invoice and
+asks the AI assistant a question. The database is the in-memory (or SQLite)
+storage backend seeded from database/schema.sql with a fixed latency per call,
+and OpenAI is benchmarks/fake_openai.py served on a local port.
+
+Reports throughput, p50/p95/p99 latency and database round-trips per route.
+--json writes the results; --baseline compares against an earlier run and
+exits non-zero if a route's p95 latency or round-trips, or the overall
+throughput, regressed by more than --tolerance.
+"""
+import argparse
+import asyncio
+import contextvars
+import json
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+from datetime import date, timedelta
+
+# Password hashing would otherwise dominate every journey; export BCRYPT_ROUNDS to measure it
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")
+os.environ.setdefault("FAKE_OPENAI_TOKEN_DELAY", "0.001")
+os.environ.setdefault("FAKE_OPENAI_TOKENS", "50")
+
+import httpx
+import numpy as np
+import openai
+import uvicorn
+
+from . import fake_openai
+from .fake_postgrest import install
+from app.main import app
+from app.storage.memory import MemoryTransport
+from app.storage.sqlite import SQLiteTransport
+
+PASSWORD = "Journey-Pa55word"
+QUESTIONS = (
+    "What should I pack for {name}?",
+    "How long does it take to reach {name}?",
+    "Is {name} safe for first-time travelers?",
+)
+
+# Database round-trips made while serving the current request
+request_round_trips = contextvars.ContextVar("request_round_trips", default=None)
+
+class CountingTransport(httpx.AsyncBaseTransport):
+    """Attributes each storage call to the request being served"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    async def handle_async_request(self, request):
+        counter = request_round_trips.get()
+        if counter is not None:
+            counter[0] += 1
+        return await self.storage.handle_async_request(request)
+
+class Recorder:
+    def __init__(self):
+        self.samples = defaultdict(list)  # route -> [(seconds, round-trips, status)]
+
+    async def send(self, client, route: str, method: str, path: str, **kwargs):
+        counter = [0]
+        token = request_round_trips.set(counter)
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, path, **kwargs)
+        finally:
+            request_round_trips.reset(token)
+        self.samples[route].append((time.perf_counter() - started, counter[0], response.status_code))
+        return response
+
+    def routes(self) -> dict:
+        results = {}
+        for route, samples in self.samples.items():
+            latencies = np.array([s[0] for s in samples]) * 1000
+            round_trips = np.array([s[1] for s in samples])
+            p50, p95, p99 = np.percentile(latencies, [50, 95, 99])
+            results[route] = {
+                "requests": len(samples),
+                "errors": sum(1 for s in samples if s[2] >= 400),
+                "p50_ms": round(float(p50), 2),
+                "p95_ms": round(float(p95), 2),
+                "p99_ms": round(float(p99), 2),
+                "db_round_trips": round(float(round_trips.mean()), 2),
+            }
+        return results
+
+def storage_backend(name: str, latency: float):
+    """The seeded storage backend, with capacity raised so journeys are never sold out"""
+    if name == "sqlite":
+        storage = SQLiteTransport(latency=latency)
+        storage.connection.execute("UPDATE accommodations SET capacity = 1000000")
+        storage.connection.execute("UPDATE packages SET capacity = 1000000")
+    else:
+        storage = MemoryTransport.from_schema(latency=latency)
+        for row in storage.tables["accommodations"] + storage.tables["packages"]:
+            row["capacity"] = 1_000_000
+    return storage
+
+def start_fake_openai() -> uvicorn.Server:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        port = s.getsockname()[1]
+    server = uvicorn.Server(uvicorn.Config(fake_openai.app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    openai.api_base = f"http://127.0.0.1:{port}/v1"
+    openai.api_key = os.environ["OPENAI_API_KEY"]
+    return server
+
+async def journey(client, recorder: Recorder, number: int):
+    """One user's visit, from registration to asking the assistant.
+
+    The journey ends early when a step the rest depend on fails; the failure
+    is still recorded against its route.
+    """
+    send = recorder.send
+    email = f"traveler-{number}@example.com"
+    response = await send(client, "POST /api/auth/register", "POST", "/api/auth/register",
+                          json={"email": email, "password": PASSWORD, "name": f"Traveler {number}"})
+    if response.status_code != 201:
+        return
+    user_id = response.json()["id"]
+    response = await send(client, "POST /api/auth/login", "POST", "/api/auth/login",
+                          data={"username": email, "password": PASSWORD})
+    if response.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    destinations = (await send(client, "GET /api/destinations/", "GET", "/api/destinations/")).json()
+    destination = destinations[number % len(destinations)]
+    await send(client, "GET /api/destinations/{destination_id}", "GET", f"/api/destinations/{destination['id']}")
+
+    accommodations = (await send(
+        client, "GET /api/accommodations/", "GET", "/api/accommodations/",
+        params={"destination_id": destination["id"], "sort": "-rating", "limit": 10},
+    )).json()
+    accommodation = accommodations[number % len(accommodations)]
+    packages = (await send(client, "GET /api/packages/", "GET", "/api/packages/")).json()
+    package = packages[number % len(packages)]
+
+    nights = 3 + number % 5
+    await send(
+        client, "GET /api/packages/calculate-price", "GET", "/api/packages/calculate-price",
+        params={"package_id": package["id"], "destination_id": destination["id"], "duration": nights,
+                "accommodation_id": accommodation["id"], "travelers": 2},
+    )
+
+    departure = date.today() + timedelta(days=30 + number % 300)
+    response = await send(client, "POST /api/bookings/", "POST", "/api/bookings/", headers=headers, json={
+        "user_id": user_id,
+        "destination_id": destination["id"],
+        "accommodation_id": accommodation["id"],
+        "package_id": package["id"],
+        "departure_date": departure.isoformat(),
+        "return_date": (departure + timedelta(days=nights)).isoformat(),
+        "travelers": 2,
+    })
+    if response.status_code == 201:
+        booking_id = response.json()["id"]
+        await send(client, "GET /api/bookings/{booking_id}/invoice", "GET",
+                   f"/api/bookings/{booking_id}/invoice", headers=headers)
+
+    question = QUESTIONS[number % len(QUESTIONS)].format(name=destination["name"])
+    await send(client, "POST /api/ai/ask", "POST", "/api/ai/ask", headers=headers, json={"question": question})
+
+async def drive(users: int, journeys: int, recorder: Recorder) -> float:
+    async def virtual_user(user: int):
+        for j in range(journeys):
+            await journey(client, recorder, user * journeys + j)
+
+    async with httpx.AsyncClient(app=app, base_url="http://test", timeout=None) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(virtual_user(u) for u in range(users)))
+        return time.perf_counter() - started
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+def regressions(results: dict, baseline: dict, tolerance: float) -> list:
+    found = []
+    limit = 1 + tolerance
+    if results["throughput_rps"] * limit < baseline["throughput_rps"]:
+        found.append(f"throughput {baseline['throughput_rps']} -> {results['throughput_rps']} req/s")
+    for route, before in baseline["routes"].items():
+        after = results["routes"].get(route)
+        if after is None:
+            continue
+        if after["p95_ms"] > before["p95_ms"] * limit:
+            found.append(f"{route}: p95 {before['p95_ms']} -> {after['p95_ms']} ms")
+        if after["db_round_trips"] > before["db_round_trips"] * limit:
+            found.append(f"{route}: db round-trips {before['db_round_trips']} -> {after['db_round_trips']}")
+    return found
+
+def report(results: dict):
+    print(
+        f"{results['journeys']} journeys, {results['requests']} requests in {results['duration_s']} s: "
+        f"{results['throughput_rps']} req/s, {results['journeys_per_s']} journeys/s"
+    )
+    print(f"{'route':<40} {'requests':>8} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'db calls':>8}")
+    for route, r in results["routes"].items():
+        print(
+            f"{route:<40} {r['requests']:>8} {r['errors']:>6} {r['p50_ms']:>8.2f} "
+            f"{r['p95_ms']:>8.2f} {r['p99_ms']:>8.2f} {r['db_round_trips']:>8.2f}"
+        )
+
+def run(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=20, help="concurrent virtual users")
+    parser.add_argument("--journeys", type=int, default=5, help="journeys per virtual user")
+    parser.add_argument("--backend", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--db-latency", type=float, default=0.002, help="seconds added to every database call")
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="results file of an earlier run to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed regression, as a fraction")
+    args = parser.parse_args(argv)
+
+    install(CountingTransport(storage_backend(args.backend, args.db_latency)))
+    server = start_fake_openai()
+    recorder = Recorder()
+    try:
+        duration = asyncio.run(drive(args.users, args.journeys, recorder))
+    finally:
+        server.should_exit = True
+
+    routes = recorder.routes()
+    requests = sum(r["requests"] for r in routes.values())
+    journeys = args.users * args.journeys
+    results = {
+        "commit": git_commit(),
+        "config": {k: v for k, v in vars(args).items() if k not in ("json", "baseline")},
+        "journeys": journeys,
+        "requests": requests,
+        "duration_s": round(duration, 3),
+        "throughput_rps": round(requests / duration, 1),
+        "journeys_per_s": round(journeys / duration, 2),
+        "routes": routes,
+    }
+    report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    failed = any(r["errors"] for r in routes.values())
+    if failed:
+        print("FAIL: some requests returned errors")
+    if args.baseline:
+        with open(args.baseline) as f:
+            found = regressions(results, json.load(f), args.tolerance)
+        for regression in found:
+            print(f"REGRESSION: {regression}")
+        failed = failed or bool(found)
+    return 1 if failed else 0
+
+if __name__ == "__main__":
+    sys.exit(run())
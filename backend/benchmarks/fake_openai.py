@@ -0,0 +1,86 @@
+"""Local stand-in for the OpenAI chat completions API.
+
+Run it and point the backend at it:
+
+    uvicorn benchmarks.fake_openai:app --port 8001
+    OPENAI_API_BASE=http://localhost:8001/v1 uvicorn app.main:app
+
+Completions are generated word by word with FAKE_OPENAI_TOKEN_DELAY seconds
+between tokens (default 0.02) and FAKE_OPENAI_TOKENS tokens per answer
+(default 200). GET /stats reports how many streams were started, finished and
+abandoned by the client, which is how streaming cancellation is verified.
+"""
+import asyncio
+import json
+import os
+import time
+import uuid
+
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+TOKEN_DELAY = float(os.getenv("FAKE_OPENAI_TOKEN_DELAY", "0.02"))
+TOKENS = int(os.getenv("FAKE_OPENAI_TOKENS", "200"))
+
+app = FastAPI(title="Fake OpenAI")
+stats = {"completions": 0, "streams_started": 0, "streams_completed": 0, "streams_cancelled": 0}
+
+def _words(body: dict):
+    prompt = body["messages"][-1]["content"]
+    seed = prompt.split() or ["space"]
+    return [seed[i % len(seed)] for i in range(min(TOKENS, body.get("max_tokens", TOKENS)))]
+
+def _usage(body: dict, completion_tokens: int):
+    prompt_tokens = sum(len(m["content"].split()) for m in body["messages"])
+    return {
+        "prompt_tokens": prompt_tokens,
+        "completion_tokens": completion_tokens,
+        "total_tokens": prompt_tokens + completion_tokens,
+    }
+
+@app.post("/v1/chat/completions")
+async def chat_completions(request: Request):
+    body = await request.json()
+    words = _words(body)
+    completion_id = f"chatcmpl-{uuid.uuid4().hex}"
+
+    if not body.get("stream"):
+        stats["completions"] += 1
+        await asyncio.sleep(TOKEN_DELAY * len(words))
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body["model"],
+            "choices": [{
+                "index": 0,
+                "message": {"role": "assistant", "content": " ".join(words)},
+                "finish_reason": "stop",
+            }],
+            "usage": _usage(body, len(words)),
+        }
+
+    async def chunks():
+        stats["streams_started"] += 1
+        try:
+            for i, word in enumerate(words):
+                await asyncio.sleep(TOKEN_DELAY)
+                chunk = {
+                    "id": completion_id,
+                    "object": "chat.completion.chunk",
+                    "created": int(time.time()),
+                    "model": body["model"],
+                    "choices": [{"index": 0, "delta": {"content": word if i == 0 else f" {word}"}, "finish_reason": None}],
+                }
+                yield f"data: {json.dumps(chunk)}\n\n"
+            yield "data: [DONE]\n\n"
+            stats["streams_completed"] += 1
+        except asyncio.CancelledError:
+            stats["streams_cancelled"] += 1
+            raise
+
+    return StreamingResponse(chunks(), media_type="text/event-stream")
+
+@app.get("/stats")
+async def get_stats():
+    return stats
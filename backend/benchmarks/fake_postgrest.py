@@ -0,0 +1,68 @@
+"""In-process stand-in for the Supabase PostgREST API.
+
+FakePostgrest is the in-memory storage backend from app.storage: an httpx
+transport that answers the PostgREST calls made by app.database from plain
+Python lists, optionally adding a fixed latency per call, and records every
+round-trip so benchmarks can count them.
+"""
+import uuid
+
+import httpx
+
+from app.storage.memory import MemoryTransport as FakePostgrest
+
+def make_catalog(destinations: int = 4, accommodations_per_destination: int = 2, packages: int = 3):
+    """Build synthetic catalog tables shaped like database/schema.sql"""
+    tables = {"destinations": [], "accommodations": [], "packages": [], "users": [], "bookings": []}
+    for d in range(destinations):
+        destination_id = str(uuid.uuid4())
+        tables["destinations"].append({
+            "id": destination_id,
+            "name": f"Destination {d}",
+            "distance": 384400.0 + d,
+            "travel_time": 72 + d,
+            "description": "Synthetic destination",
+            "features": ["Low gravity experience"],
+            "css_style_data": {"primaryColor": "#8a9ba8"},
+            "price_factor": 1.0 + (d % 5) * 0.25,
+        })
+        for a in range(accommodations_per_destination):
+            tables["accommodations"].append({
+                "id": str(uuid.uuid4()),
+                "destination_id": destination_id,
+                "name": f"Accommodation {d}-{a}",
+                "type": "Luxury Suite" if a % 2 == 0 else "Standard Room",
+                "description": "Synthetic accommodation",
+                "amenities": ["Earth view windows"],
+                "price_per_night": 8000.0 + 1000 * ((d + a) % 10),
+                "capacity": 2 + a % 4,
+                "rating": round(4.0 + ((d * 7 + a) % 10) / 10, 1),
+                "css_style_data": {"primaryColor": "#1a1a2e"},
+                "availability": {},
+                "reviews": [{"rating": 5, "comment": "x" * 200}] * 20,
+            })
+    for p in range(packages):
+        tables["packages"].append({
+            "id": str(uuid.uuid4()),
+            "name": f"Package {p}",
+            "class_type": ["First Class", "Business Class", "Economy Class"][p % 3],
+            "price": 12000.0 * (p + 1),
+            "features": ["Priority boarding"],
+            "capacity": 4 + 2 * p,
+            "css_style_data": {"primaryColor": "#2d3e50"},
+        })
+    return tables
+
+def install(fake: FakePostgrest):
+    """Route app.database through the fake instead of the real Supabase project"""
+    from app import database
+    from app.cache import user_cache
+
+    database.supabase.session = httpx.AsyncClient(
+        base_url=str(database.supabase.session.base_url),
+        headers=database.supabase.session.headers,
+        transport=fake,
+    )
+    database.invalidate_catalog()
+    user_cache.clear()
+    return fake
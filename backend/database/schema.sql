@@ -103,6 +103,7 @@ CREATE TABLE bookings (
 
 -- Create indexes for bookings
 CREATE INDEX bookings_user_id_idx ON bookings (user_id);
+CREATE INDEX bookings_user_id_created_at_idx ON bookings (user_id, created_at DESC, id);
 CREATE INDEX bookings_destination_id_idx ON bookings (destination_id);
 CREATE INDEX bookings_accommodation_id_idx ON bookings (accommodation_id);
 CREATE INDEX bookings_package_id_idx ON bookings (package_id);
@@ -0,0 +1,52 @@
+import asyncio
+import os
+
+os.environ["DATABASE_BACKEND"] = "memory"
+os.environ.setdefault("BCRYPT_ROUNDS", "4")
+
+import httpx
+
+from app.database import supabase
+from app.main import app
+
+PASSWORD = "Dates-Pa55word"
+
+async def _update_one_date_of_stored_booking():
+    async with httpx.AsyncClient(app=app, base_url="http://test") as client:
+        response = await client.post(
+            "/api/auth/register", json={"email": "dates@example.com", "password": PASSWORD, "name": "Dates"}
+        )
+        user_id = response.json()["id"]
+        response = await client.post("/api/auth/login", data={"username": "dates@example.com", "password": PASSWORD})
+        headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+        destination = (await client.get("/api/destinations/")).json()[0]
+        accommodation = (await client.get("/api/accommodations/", params={"destination_id": destination["id"]})).json()[0]
+        package = (await client.get("/api/packages/")).json()[0]
+
+        # PostgREST returns TIMESTAMP WITH TIME ZONE columns with an offset
+        stored = (await supabase.table("bookings").insert({
+            "user_id": user_id,
+            "destination_id": destination["id"],
+            "accommodation_id": accommodation["id"],
+            "package_id": package["id"],
+            "departure_date": "2031-01-01T00:00:00+00:00",
+            "return_date": "2031-01-05T00:00:00+00:00",
+            "travelers": 1,
+            "total_price": 0,
+            "status": "Confirmed",
+        }).execute()).data[0]
+
+        response = await client.put(f"/api/bookings/{stored['id']}", json={"return_date": "2031-01-09"}, headers=headers)
+        quote = await client.get("/api/packages/calculate-price", params={
+            "package_id": package["id"],
+            "destination_id": destination["id"],
+            "accommodation_id": accommodation["id"],
+            "duration": 8,
+        })
+        return response, quote.json()
+
+def test_update_one_date_of_booking_stored_with_timezone():
+    response, quote = asyncio.run(_update_one_date_of_stored_booking())
+    assert response.status_code == 200, response.text
+    assert response.json()["total_price"] == quote["final_price"]